@@ -1,21 +1,33 @@
 import os
 import datetime
+import importlib
 import logging
+import logging.handlers
+import queue
+import sys
+import time
+from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import Callable
 
-import requests
+import httpx
+import orjson
 import uvicorn
-import yaml
-from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+
+# the shared config loader lives at the repository root
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from garvis_config import load_cfg  # noqa: E402
+
 
 # read router config (default relative to repository root)
 CFG_PATH = os.environ.get(
     "ROUTER_CONFIG",
     str(Path(__file__).resolve().parents[1] / "router" / "router.yaml"),
 )
-with open(CFG_PATH, "r", encoding="utf-8") as f:
-    CFG = yaml.safe_load(f)
+CFG = load_cfg(CFG_PATH)
 
 PROXY_CFG = CFG.get("evaluator_proxy", {})
 BIND_HOST = PROXY_CFG.get("bind_host", "127.0.0.1")
@@ -29,20 +41,98 @@ LOG_FILE = PROXY_CFG.get(
 ENDPOINTS = CFG["endpoints"]  # mapping of alias to URL
 INVENTORY = CFG.get("inventory", {})  # includes real_model mapping
 
+# timeouts for router and upstream calls (connect is kept short)
+CONNECT_TIMEOUT_S = 5
+ROUTER_TIMEOUT = httpx.Timeout(60, connect=CONNECT_TIMEOUT_S)
+UPSTREAM_TIMEOUT = httpx.Timeout(300, connect=CONNECT_TIMEOUT_S)
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# shared async client: calls are awaited, so a single worker overlaps
+# many in-flight generations, and connections are kept alive between them
+CLIENT = httpx.AsyncClient(
+    timeout=UPSTREAM_TIMEOUT,
+    limits=httpx.Limits(max_keepalive_connections=64, max_connections=128),
+)
+
 # ensure log directory exists
 os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
-logging.basicConfig(
-    filename=LOG_FILE,
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-)
+# handlers only enqueue records; a listener thread does the file writes
+_file_handler = logging.FileHandler(LOG_FILE, encoding="utf-8")
+_file_handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
+LOG_QUEUE: queue.SimpleQueue = queue.SimpleQueue()
+LOG_LISTENER = logging.handlers.QueueListener(LOG_QUEUE, _file_handler)
+# the queued record already carries the rendered message; only the file
+# handler adds timestamp/level, so the line is formatted once
+_queue_handler = logging.handlers.QueueHandler(LOG_QUEUE)
+_queue_handler.setFormatter(logging.Formatter("%(message)s"))
+logging.basicConfig(level=logging.INFO, handlers=[_queue_handler])
+# httpx logs every request at INFO; keep the file to DECISION lines and problems
+logging.getLogger("httpx").setLevel(logging.WARNING)
+LOG_LISTENER.start()
 
-app = FastAPI()
+# single-host setups can set evaluator_proxy.local_router to call the
+# router's evaluate_choice in-process instead of POSTing to /evaluate; if the
+# router module cannot be imported the proxy keeps using HTTP
+LOCAL_EVALUATE: Callable[[str, str | None], dict] | None = None
+if PROXY_CFG.get("local_router", False):
+    os.environ.setdefault("ROUTER_CONFIG", CFG_PATH)
+    try:
+        LOCAL_EVALUATE = importlib.import_module("router.gar_router").evaluate_choice
+    except Exception as e:
+        logging.warning(f"local router unavailable, using {ROUTER_EVAL}: {e}")
 
 
-@app.get("/api/tags")
-async def tags():
-    # Return alias-based catalogue
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await CLIENT.aclose()
+    LOG_LISTENER.stop()
+
+
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
+
+
+# router decisions keyed on (model, prompt tokens), reused for a short TTL to
+# skip the proxy -> router round trip; the token estimate is the router's own
+# max(1, len(prompt) >> 2), so a reused decision still fits the same contexts
+DECISION_TTL_S = float(PROXY_CFG.get("decision_cache_ttl_s", 30))
+DECISION_CACHE_MAX = 1024
+_DECISIONS: dict[tuple, tuple[float, dict]] = {}
+
+
+def _cached_decision(key: tuple) -> dict | None:
+    hit = _DECISIONS.get(key)
+    if hit is not None and hit[0] > time.monotonic():
+        return hit[1]
+    return None
+
+
+def _store_decision(key: tuple, ev: dict) -> None:
+    if DECISION_TTL_S <= 0:
+        return
+    _DECISIONS.pop(key, None)
+    if len(_DECISIONS) >= DECISION_CACHE_MAX:
+        # dicts keep insertion order: drop the oldest entry
+        _DECISIONS.pop(next(iter(_DECISIONS)))
+    _DECISIONS[key] = (time.monotonic() + DECISION_TTL_S, ev)
+
+
+_TAGS_CACHE: tuple = ()
+
+
+def _tags_body() -> bytes:
+    """Serialized /api/tags catalogue.
+
+    Rebuilt once a minute (so modified_at keeps moving) or when INVENTORY is
+    rebound; every other request reuses the encoded bytes.
+    """
+    global _TAGS_CACHE
+    minute = int(time.time() // 60)
+    if _TAGS_CACHE and _TAGS_CACHE[0] is INVENTORY and _TAGS_CACHE[1] == minute:
+        return _TAGS_CACHE[2]
+
+    modified_at = datetime.datetime.utcnow().isoformat() + "Z"
     items = []
     for alias, meta in INVENTORY.items():
         pm = meta.get("params", {})
@@ -55,7 +145,7 @@ async def tags():
             {
                 "name": alias,
                 "model": alias,
-                "modified_at": datetime.datetime.utcnow().isoformat() + "Z",
+                "modified_at": modified_at,
                 "size": 0,
                 "digest": "alias",
                 "details": {
@@ -65,21 +155,44 @@ async def tags():
                 },
             }
         )
-    return {"models": items}
+    body = orjson.dumps({"models": items})
+    _TAGS_CACHE = (INVENTORY, minute, body)
+    return body
+
+
+@app.get("/api/tags")
+async def tags():
+    # Return alias-based catalogue
+    return Response(content=_tags_body(), media_type="application/json")
 
 
 @app.post("/api/generate")
 async def generate(request: Request):
-    body = await request.json()
-    # 1) ask router to decide
-    try:
-        router_resp = requests.post(ROUTER_EVAL, json=body, timeout=60)
-        router_resp.raise_for_status()
-        ev = router_resp.json().get("evaluator", {})
-    except Exception as e:
-        return JSONResponse(
-            status_code=500, content={"error": f"router/evaluate failed: {e}"}
-        )
+    raw = await request.body()
+    body = orjson.loads(raw)
+    # 1) ask router to decide (unless a recent decision for this model and
+    #    prompt size is still cached)
+    cache_key = (body.get("model"), max(1, len(body.get("prompt", "") or "") >> 2))
+    ev = _cached_decision(cache_key)
+    if ev is None and LOCAL_EVALUATE is not None:
+        try:
+            ev = LOCAL_EVALUATE(body.get("prompt", ""), body.get("model"))
+        except Exception as e:
+            return ORJSONResponse(
+                status_code=500, content={"error": f"router/evaluate failed: {e}"}
+            )
+    if ev is None:
+        try:
+            # forward the client's bytes as-is instead of re-encoding body
+            router_resp = await CLIENT.post(
+                ROUTER_EVAL, content=raw, headers=JSON_HEADERS, timeout=ROUTER_TIMEOUT
+            )
+            router_resp.raise_for_status()
+            ev = orjson.loads(router_resp.content).get("evaluator", {})
+        except Exception as e:
+            return ORJSONResponse(
+                status_code=500, content={"error": f"router/evaluate failed: {e}"}
+            )
 
     decision = ev.get("decision", {})
     reason = ev.get("reason", "")
@@ -90,9 +203,10 @@ async def generate(request: Request):
     real_model = decision.get("real_model")
 
     if not alias_model or not endpoint_key or endpoint_key not in ENDPOINTS:
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=500, content={"error": f"invalid decision from evaluator: {ev}"}
         )
+    _store_decision(cache_key, ev)
 
     # derive real model name from decision or inventory
     if not real_model:
@@ -109,24 +223,51 @@ async def generate(request: Request):
     )
 
     # call upstream Ollama /api/generate with real model
+    resp = None
     try:
         upstream_url = f"{ENDPOINTS[endpoint_key]}/api/generate"
-        upstream_body = dict(body)
-        upstream_body["model"] = real_model
-        resp = requests.post(upstream_url, json=upstream_body, timeout=300)
+        # body is this request's own parsed dict, so swap the model in place
+        body["model"] = real_model
+        req = CLIENT.build_request(
+            "POST",
+            upstream_url,
+            content=orjson.dumps(body),
+            headers=JSON_HEADERS,
+            timeout=UPSTREAM_TIMEOUT,
+        )
+        resp = await CLIENT.send(req, stream=True)
         resp.raise_for_status()
-        gen_data = resp.json()
     except Exception as e:
-        return JSONResponse(
+        if resp is not None:
+            await resp.aclose()
+        return ORJSONResponse(
             status_code=500,
             content={"error": f"upstream generate failed on {endpoint_key}: {e}"},
         )
 
-    # return pure model response
-    return JSONResponse(content=gen_data)
+    # pass the model response through chunk by chunk (NDJSON when the client
+    # asked Ollama to stream); the upstream connection closes afterwards
+    return StreamingResponse(
+        resp.aiter_bytes(),
+        status_code=resp.status_code,
+        media_type=resp.headers.get("content-type", "application/x-ndjson"),
+        background=BackgroundTask(resp.aclose),
+    )
 
 
 if __name__ == "__main__":
     # support port override via environment variable (e.g. from start_all.sh)
     port = int(os.environ.get("PORT", DEFAULT_BIND_PORT))
-    uvicorn.run(app, host=BIND_HOST, port=port)
+    workers = int(os.environ.get("WORKERS", 1))
+    # uvicorn[standard] provides uvloop (non-Windows) and httptools, which
+    # uvicorn's "auto" loop/http settings pick up; multiple workers need an
+    # import string instead of the app object
+    uvicorn.run(
+        "evaluator_proxy:app" if workers > 1 else app,
+        host=BIND_HOST,
+        port=port,
+        workers=workers,
+        loop="auto",
+        http="auto",
+        access_log=False,
+    )
@@ -0,0 +1,40 @@
+"""Shared router.yaml loader for the GARVIS services and tools."""
+
+import contextlib
+import json
+import os
+
+import yaml
+
+try:
+    from yaml import CSafeLoader as _Loader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader as _Loader  # type: ignore[assignment]
+
+
+def load_cfg(path: str | os.PathLike) -> dict:
+    """Load the YAML config, reusing a JSON sidecar while the YAML is unchanged."""
+    path = os.fspath(path)
+    cache = path + ".cache.json"
+    st = os.stat(path)
+    stamp = [st.st_mtime_ns, st.st_size]
+    try:
+        with open(cache, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached.get("stamp") == stamp:
+            return cached["cfg"]
+    except (OSError, ValueError, AttributeError, KeyError):
+        pass
+
+    with open(path, "r", encoding="utf-8") as f:
+        cfg = yaml.load(f, Loader=_Loader)
+    # atomic write so concurrent starts never see a half-written sidecar
+    tmp = f"{cache}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"stamp": stamp, "cfg": cfg}, f, ensure_ascii=False)
+        os.replace(tmp, cache)
+    except (OSError, TypeError, ValueError):
+        with contextlib.suppress(OSError):
+            os.remove(tmp)
+    return cfg
@@ -5,10 +5,12 @@ import socket
 import subprocess
 import time
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import requests
-import yaml
+
+from garvis_config import load_cfg
 
 BASE_DIR = Path(__file__).resolve().parent
 ROUTER_YAML = BASE_DIR / "router" / "router.yaml"
@@ -37,6 +39,15 @@ def port_listening(port):
         return s.connect_ex(("127.0.0.1", port)) == 0
 
 
+def probe_http(key, url):
+    try:
+        r = requests.get(url, timeout=HTTP_TIMEOUT)
+        ok = r.status_code == 200
+        return {"key": key, "url": url, "ok": ok, "code": r.status_code}
+    except Exception as e:
+        return {"key": key, "url": url, "ok": False, "error": str(e)}
+
+
 # core paths
 paths = [
     BASE_DIR / "router" / "logs",
@@ -67,39 +78,30 @@ else:
             {"path": ollama, "note": "version call timed out"},
         )
 
-# expected ports
-port_details = []
-missing_ports = []
-for port in EXPECTED_PORTS:
-    ok = port_listening(port)
-    port_details.append({"port": port, "listening": ok})
-    if not ok:
-        missing_ports.append(port)
-add_result(
-    "expected ports listening",
-    "pass" if not missing_ports else "fail",
-    {"details": port_details, "missing": missing_ports},
-)
-
-# HTTP endpoints
+# expected ports and HTTP endpoints (probed concurrently)
 endpoints = [
     ("gpu0", "http://127.0.0.1:11434/api/tags"),
     ("gpu1", "http://127.0.0.1:11435/api/tags"),
     ("cpu", "http://127.0.0.1:11436/api/tags"),
     ("eval", "http://127.0.0.1:11437/api/tags"),
 ]
-http_data = []
-bad = []
-for key, url in endpoints:
-    try:
-        r = requests.get(url, timeout=HTTP_TIMEOUT)
-        ok = r.status_code == 200
-        http_data.append({"key": key, "url": url, "ok": ok, "code": r.status_code})
-        if not ok:
-            bad.append(key)
-    except Exception as e:
-        http_data.append({"key": key, "url": url, "ok": False, "error": str(e)})
-        bad.append(key)
+with ThreadPoolExecutor(max_workers=16) as ex:
+    port_results = ex.map(port_listening, EXPECTED_PORTS)
+    http_results = ex.map(lambda kv: probe_http(*kv), endpoints)
+    port_details = [
+        {"port": port, "listening": ok}
+        for port, ok in zip(EXPECTED_PORTS, port_results)
+    ]
+    http_data = list(http_results)
+
+missing_ports = [d["port"] for d in port_details if not d["listening"]]
+add_result(
+    "expected ports listening",
+    "pass" if not missing_ports else "fail",
+    {"details": port_details, "missing": missing_ports},
+)
+
+bad = [d["key"] for d in http_data if not d["ok"]]
 add_result(
     "HTTP endpoints reachable",
     "pass" if not bad else "warn",
@@ -114,8 +116,7 @@ if not ROUTER_YAML.exists():
         {"path": str(ROUTER_YAML)},
     )
 else:
-    with open(ROUTER_YAML, "r", encoding="utf-8") as f:
-        cfg = yaml.safe_load(f)
+    cfg = load_cfg(ROUTER_YAML)
     issues = []
     eps = list(cfg.get("endpoints", {}).keys())
     inv = list(cfg.get("inventory", {}).keys())
@@ -1,32 +1,56 @@
 import argparse
+import asyncio
+import functools
 import json
 import os
-import socketserver
+import queue
+import re
 import sys
+import threading
 import time
-from http.server import BaseHTTPRequestHandler, HTTPServer
+from collections import Counter
+from contextlib import asynccontextmanager
 from pathlib import Path
-
-import requests
-import yaml
-
-# parse CLI arg for config path (default to router.yaml next to this file)
+from typing import NamedTuple
+
+import httpx
+import orjson
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse
+
+# the shared config loader lives at the repository root
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from garvis_config import load_cfg  # noqa: E402
+
+try:
+    import ahocorasick  # pyahocorasick (optional)
+except ImportError:
+    ahocorasick = None
+
+# parse CLI arg for config path (default: $ROUTER_CONFIG, else router.yaml
+# next to this file); unknown args are ignored so the module can also be
+# imported in-process by evaluator_proxy
 parser = argparse.ArgumentParser()
-default_cfg = Path(__file__).with_name("router.yaml")
-parser.add_argument("--config", default=str(default_cfg))
-args = parser.parse_args()
+default_cfg = os.environ.get(
+    "ROUTER_CONFIG", str(Path(__file__).with_name("router.yaml"))
+)
+parser.add_argument("--config", default=default_cfg)
+args, _ = parser.parse_known_args()
+
 
 # load YAML configuration
-with open(args.config, "r", encoding="utf-8") as f:
-    CFG = yaml.safe_load(f)
+CFG = load_cfg(args.config)
 
 MODE = CFG["router"].get("mode", "heuristic")
 BIND_HOST = CFG["router"].get("bind_host", "127.0.0.1")
 BIND_PORT = int(CFG["router"].get("bind_port", 28100))
 TIMEOUT_S = int(CFG["router"].get("request_timeout_s", 300))
+CONNECT_TIMEOUT_S = float(CFG["router"].get("connect_timeout_s", 5))
 LOG_PATH = CFG["router"]["log_path"]
 
-ENDPOINTS = CFG["endpoints"]
+# endpoint keys are interned: they are compared on every routing decision
+ENDPOINTS = {sys.intern(k): v for k, v in CFG["endpoints"].items()}
 MODEL_MAP = CFG.get("model_map", {})
 KEYWORDS = {k: [kw.lower() for kw in v] for k, v in CFG.get("keywords", {}).items()}
 DEFAULT_MODELS = CFG.get("default_models", {})
@@ -37,21 +61,115 @@ POLICY = CFG.get("policy", {})
 
 os.makedirs(os.path.dirname(LOG_PATH), exist_ok=True)
 
+# shared async client: upstream Ollama calls reuse keep-alive connections
+# and overlap on one event loop instead of pinning a thread each
+# (connect and read timeouts are set per client, never process-wide)
+# pool limits go on the transport: AsyncClient ignores limits= once a
+# transport is given
+CLIENT = httpx.AsyncClient(
+    timeout=httpx.Timeout(TIMEOUT_S, connect=CONNECT_TIMEOUT_S),
+    transport=httpx.AsyncHTTPTransport(
+        retries=2,
+        limits=httpx.Limits(max_keepalive_connections=64, max_connections=128),
+    ),
+)
+
+
+# route events are queued and written by one background thread in batches
+# (up to LOG_BATCH events or LOG_FLUSH_S seconds per write + fsync)
+LOG_BATCH = 64
+LOG_FLUSH_S = 0.2
+LOG_Q: queue.SimpleQueue = queue.SimpleQueue()
+
+
+def _drain_log() -> None:
+    with open(LOG_PATH, "a", encoding="utf-8") as f:
+        stop = False
+        while not stop:
+            ev = LOG_Q.get()
+            if ev is None:
+                return
+            batch = [ev]
+            deadline = time.monotonic() + LOG_FLUSH_S
+            while len(batch) < LOG_BATCH:
+                try:
+                    ev = LOG_Q.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if ev is None:
+                    stop = True
+                    break
+                batch.append(ev)
+            try:
+                f.write(
+                    "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in batch)
+                )
+                f.flush()
+                os.fsync(f.fileno())
+            except OSError as e:
+                print(f"[GAR-ROUTER] log write failed: {e}", file=sys.stderr)
+
+
+LOG_WRITER = threading.Thread(target=_drain_log, name="log-writer", daemon=True)
+LOG_WRITER.start()
+
 
 def log_event(ev: dict):
     ev["ts"] = time.strftime("%Y-%m-%dT%H:%M:%S%z")
-    with open(LOG_PATH, "a", encoding="utf-8") as f:
-        f.write(json.dumps(ev, ensure_ascii=False) + "\n")
+    LOG_Q.put(ev)
 
 
-def pick_by_keywords(prompt: str) -> str:
-    p = (prompt or "").lower()
-    scores = {k: 0 for k in KEYWORDS.keys()}
-    for target, kws in KEYWORDS.items():
+def _keyword_scanner(kws: list[str]):
+    """Return a function giving the set of ``kws`` found in a text.
+
+    The text is scanned once for all keywords: with an Aho-Corasick automaton
+    when pyahocorasick is installed, otherwise with one alternation whose
+    lookahead reports the longest keyword starting at each position; a
+    keyword contained in that hit is present too, so ``covers`` maps each hit
+    to every keyword it implies.
+    """
+    kws = sorted({kw for kw in kws if kw}, key=len, reverse=True)
+    if not kws:
+        return lambda text: set()
+    if ahocorasick is not None:
+        automaton = ahocorasick.Automaton()
+        for kw in kws:
+            automaton.add_word(kw, kw)
+        automaton.make_automaton()
+        return lambda text: {kw for _, kw in automaton.iter(text)}
+
+    pat = re.compile("(?=(" + "|".join(map(re.escape, kws)) + "))")
+    covers = {kw: frozenset(k for k in kws if k in kw) for kw in kws}
+
+    def scan(text: str) -> set:
+        hits = set(pat.findall(text))
+        return set().union(*(covers[h] for h in hits)) if hits else set()
+
+    return scan
+
+
+def _keyword_index(keywords: dict[str, list[str]]):
+    """(target order, scanner over all keywords, keyword -> targets) for routing."""
+    owners: dict[str, list[str]] = {}
+    for target, kws in keywords.items():
         for kw in kws:
-            if kw in p:
-                scores[target] += 1
-    return max(scores, key=lambda k: scores[k]) if any(scores.values()) else "gpu0"
+            if target not in owners.setdefault(kw, []):
+                owners[kw].append(target)
+    return list(keywords), _keyword_scanner(list(owners)), owners
+
+
+KEYWORD_INDEX = _keyword_index(KEYWORDS)
+
+
+def pick_by_keywords(prompt: str) -> str:
+    # score = number of distinct keywords found; first target wins ties
+    order, scan, owners = KEYWORD_INDEX
+    scores = Counter(t for kw in scan((prompt or "").lower()) for t in owners[kw])
+    best, best_score = "gpu0", 0
+    for target in order:
+        if scores[target] > best_score:
+            best, best_score = target, scores[target]
+    return best
 
 
 def resolve_target(payload: dict):
@@ -59,28 +177,34 @@ def resolve_target(payload: dict):
     prompt = payload.get("prompt", "")
 
     alias = _normalize_alias(model)  # <— добавили
-    if alias and alias in MODEL_MAP:
-        key = MODEL_MAP[alias]
+    key = _config_tables().model_map.get(alias) if alias else None
+    if key:
         return key, ENDPOINTS[key]
 
     key = pick_by_keywords(prompt)
     return key, ENDPOINTS[key]
 
 
+@functools.lru_cache(maxsize=512)
 def _normalize_alias(name: str | None) -> str | None:
     """Normalize model alias names by stripping ":latest" and lowering."""
     if not name:
         return None
-    return name.lower().removesuffix(":latest")
+    alias = name.lower()
+    if alias.endswith(":latest"):
+        alias = alias[:-7]
+    return alias
 
 
-def _post_json(url: str, body: dict) -> dict:
-    r = requests.post(url, json=body, timeout=TIMEOUT_S)
+async def _post_json(url: str, body: dict) -> dict:
+    r = await CLIENT.post(url, json=body)
     r.raise_for_status()
-    return json.loads(r.content.decode("utf-8", errors="replace"))
+    return orjson.loads(r.content)
 
 
-def forward_generate(base_url: str, payload: dict, default_model: str | None) -> dict:
+async def forward_generate(
+    base_url: str, payload: dict, default_model: str | None
+) -> dict:
     """
     Try /api/generate first. If missing, fall back to /api/chat.
     Alias model names are mapped to real model names via the inventory.
@@ -99,9 +223,9 @@ def forward_generate(base_url: str, payload: dict, default_model: str | None) ->
     if real_model:
         gen_body["model"] = real_model
     try:
-        return _post_json(f"{base_url}/api/generate", gen_body)
-    except requests.HTTPError as e:
-        if e.response is not None and e.response.status_code == 404:
+        return await _post_json(f"{base_url}/api/generate", gen_body)
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 404:
             # fallback to /api/chat
             pass
         else:
@@ -115,186 +239,253 @@ def forward_generate(base_url: str, payload: dict, default_model: str | None) ->
     }
     if not chat_body["model"]:
         chat_body.pop("model", None)
-    return _post_json(f"{base_url}/api/chat", chat_body)
+    return await _post_json(f"{base_url}/api/chat", chat_body)
 
 
 # evaluator functions (token estimation and hardware selection)
-def estimate_tokens(text: str) -> int:
-    return max(1, int(len(text or "") / 4))
+@functools.lru_cache(maxsize=32)
+def est_latency_s(hw_key: str, out_tokens: int = 150) -> float:
+    tok_s = HARDWARE.get(hw_key, {}).get("est_tok_s", 10)
+    return round(out_tokens / max(1, tok_s), 2)
 
 
-def fits_context(prompt_tokens: int, ctx_tokens: int, margin: float) -> bool:
-    return prompt_tokens * (1 + margin) < ctx_tokens
+class _Tables(NamedTuple):
+    margin: float
+    lat: dict[str, float]  # est_latency_s per endpoint key (static per config)
+    # one (model, endpoint, ctx_tokens, vram_req_gb, endpoint_vram_gb, est_latency_s)
+    # row per INVENTORY entry, in inventory order
+    rows: tuple
+    row_of: dict[str, tuple]  # normalized alias -> row
+    model_map: dict[str, str]  # MODEL_MAP keyed on normalized alias
 
 
-def est_latency_s(hw_key: str, out_tokens: int = 150) -> float:
-    tok_s = HARDWARE.get(hw_key, {}).get("est_tok_s", 10)
-    return round(out_tokens / max(1, tok_s), 2)
+_TABLES: tuple = ()
 
 
-def evaluate_choice(prompt: str, hint_model: str | None = None) -> dict:
-    ptoks = estimate_tokens(prompt)
-    margin = float(POLICY.get("min_ctx_margin", 0.2))
-
-    candidates = []
-    nm = _normalize_alias(hint_model)  # <— добавили
-    if nm and nm in INVENTORY:
-        meta = INVENTORY[nm]
-        candidates.append((nm, meta["endpoint"], meta))
-    else:
+def _config_tables() -> _Tables:
+    """Return values derived from INVENTORY/HARDWARE/POLICY/ENDPOINTS/MODEL_MAP.
+
+    They are rebuilt, and the decision caches cleared, whenever one of those
+    globals is rebound (config reload, tests monkeypatching them).
+    """
+    global _TABLES
+    src = (INVENTORY, HARDWARE, POLICY, ENDPOINTS, MODEL_MAP)
+    if not _TABLES or any(a is not b for a, b in zip(_TABLES[0], src)):
+        _decide.cache_clear()
+        est_latency_s.cache_clear()
+        hw_keys = {*HARDWARE, *ENDPOINTS, "cpu"}
+        hw_keys.update(meta["endpoint"] for meta in INVENTORY.values())
+        lat = {hw: est_latency_s(hw) for hw in hw_keys}
+        rows = []
         for mkey, meta in INVENTORY.items():
-            candidates.append((mkey, meta["endpoint"], meta))
-
-    # apply context/vram constraints
-    filtered = []
-    for mkey, hw, meta in candidates:
-        params = meta.get("params", {})
-        ctx_ok = fits_context(ptoks, params.get("ctx_tokens", 4096), margin)
-        vram_ok = params.get("vram_req_gb", 0) <= HARDWARE.get(hw, {}).get("vram_gb", 0)
-        if ctx_ok and vram_ok:
-            filtered.append((mkey, hw, meta))
-
-    if not filtered:
+            hw = sys.intern(meta["endpoint"])
+            params = meta.get("params", {})
+            rows.append(
+                (
+                    mkey,
+                    hw,
+                    params.get("ctx_tokens", 4096),
+                    params.get("vram_req_gb", 0),
+                    HARDWARE.get(hw, {}).get("vram_gb", 0),
+                    lat[hw],
+                )
+            )
+        # aliases are normalized (and interned: config keys only, never
+        # client-supplied names, which would then live forever) once here, so
+        # request-time lookups are a single dict probe; the first entry wins
+        # if two keys normalize alike
+        row_of: dict[str, tuple] = {}
+        for row in rows:
+            row_of.setdefault(sys.intern(_normalize_alias(row[0]) or row[0]), row)
+        model_map: dict[str, str] = {}
+        for k, v in MODEL_MAP.items():
+            model_map.setdefault(sys.intern(_normalize_alias(k) or k), v)
+        _TABLES = (
+            src,
+            _Tables(
+                margin=float(POLICY.get("min_ctx_margin", 0.2)),
+                lat=lat,
+                rows=tuple(rows),
+                row_of=row_of,
+                model_map=model_map,
+            ),
+        )
+    return _TABLES[1]
+
+
+@functools.lru_cache(maxsize=512)
+def _decide(alias: str | None, ptoks: int, margin: float) -> tuple:
+    """Return (model, endpoint, reason, est_latency_s) for a normalized hint."""
+    tables = _config_tables()
+    lat = tables.lat
+    hinted = tables.row_of.get(alias) if alias else None
+    candidates: tuple = (hinted,) if hinted else tables.rows
+
+    # apply context/vram constraints; keep the first lowest-latency fit
+    limit = ptoks * (1 + margin)
+    best: tuple | None = None
+    for row in candidates:
+        _, _, ctx, vreq, vgb, est = row
+        if limit < ctx and vreq <= vgb and (best is None or est < best[5]):
+            best = row
+
+    if best is None:
         if POLICY.get("allow_cpu", True) and "cpu" in ENDPOINTS:
-            return {
-                "decision": {"model": "gar-router:latest", "endpoint": "cpu"},
-                "reason": "No GPU candidate fits; fallback to CPU.",
-                "est_latency_s": est_latency_s("cpu"),
-                "constraints": {"prompt_tokens": ptoks, "ctx_margin": margin},
-            }
+            return (
+                "gar-router:latest",
+                "cpu",
+                "No GPU candidate fits; fallback to CPU.",
+                lat["cpu"],
+            )
         if candidates:
-            mkey, hw, meta = candidates[0]
-            return {
-                "decision": {"model": mkey, "endpoint": hw},
-                "reason": "No perfect fit; choosing first available.",
-                "est_latency_s": est_latency_s(hw),
-                "constraints": {"prompt_tokens": ptoks, "ctx_margin": margin},
-            }
-        return {
-            "decision": {"model": "gar-router:latest", "endpoint": "cpu"},
-            "reason": "No candidates at all; defaulting to CPU.",
-            "est_latency_s": est_latency_s("cpu"),
-            "constraints": {"prompt_tokens": ptoks, "ctx_margin": margin},
-        }
+            mkey, hw = candidates[0][:2]
+            return (
+                mkey,
+                hw,
+                "No perfect fit; choosing first available.",
+                lat[hw],
+            )
+        return (
+            "gar-router:latest",
+            "cpu",
+            "No candidates at all; defaulting to CPU.",
+            lat["cpu"],
+        )
 
-    best = sorted(filtered, key=lambda t: est_latency_s(t[1]))[0]
-    mkey, hw, meta = best
+    return (
+        best[0],
+        best[1],
+        "Chosen by strengths/context and lowest est. latency.",
+        best[5],
+    )
+
+
+def evaluate_choice(prompt: str, hint_model: str | None = None) -> dict:
+    margin = _config_tables().margin
+    ptoks = max(1, len(prompt or "") >> 2)  # ~4 chars per token
+    model, endpoint, reason, est = _decide(_normalize_alias(hint_model), ptoks, margin)
     return {
-        "decision": {"model": mkey, "endpoint": hw},
-        "reason": "Chosen by strengths/context and lowest est. latency.",
-        "est_latency_s": est_latency_s(hw),
+        "decision": {"model": model, "endpoint": endpoint},
+        "reason": reason,
+        "est_latency_s": est,
         "constraints": {"prompt_tokens": ptoks, "ctx_margin": margin},
     }
 
 
-# HTTP handler
-class Handler(BaseHTTPRequestHandler):
-    def do_POST(self):
-        try:
-            length = int(self.headers.get("Content-Length", "0"))
-            raw = self.rfile.read(length)
-            payload = json.loads(raw.decode("utf-8", errors="replace")) if raw else {}
-            prompt = payload.get("prompt", "")
-
-            if self.path == "/evaluate":
-                hint_model = payload.get("model")
-                result = evaluate_choice(prompt, hint_model)
-                data = json.dumps({"evaluator": result}, ensure_ascii=False).encode(
-                    "utf-8"
-                )
-                return self._send_json(200, data)
-
-            if self.path == "/route_and_generate":
-                hint_model = payload.get("model")
-                ev = evaluate_choice(prompt, hint_model)
-                target_key = ev["decision"]["endpoint"]
-                chosen_model = ev["decision"]["model"]
-                default_model = DEFAULT_MODELS.get(target_key)
-                payload["upstream_model"] = chosen_model
-                t0 = time.time()
-                upstream = forward_generate(
-                    ENDPOINTS[target_key], payload, default_model
-                )
-                dt = round(time.time() - t0, 3)
-                out = {
-                    "evaluator": ev,
-                    "router": {
-                        "mode": MODE,
-                        "target": target_key,
-                        "endpoint": ENDPOINTS[target_key],
-                        "elapsed_s": dt,
-                    },
-                    "upstream_response": upstream,
-                }
-                data = json.dumps(out, ensure_ascii=False).encode("utf-8")
-                log_event(
-                    {
-                        "event": "route",
-                        "target": target_key,
-                        "endpoint": ENDPOINTS[target_key],
-                        "len_prompt": len(prompt),
-                        "elapsed_s": dt,
-                    }
-                )
-                return self._send_json(200, data)
-
-            if self.path == "/generate":
-                target_key, target_url = resolve_target(payload)
-                default_model = DEFAULT_MODELS.get(target_key)
-                t0 = time.time()
-                upstream = forward_generate(target_url, payload, default_model)
-                dt = round(time.time() - t0, 3)
-                out = {
-                    "router": {
-                        "mode": MODE,
-                        "target": target_key,
-                        "endpoint": target_url,
-                        "elapsed_s": dt,
-                    },
-                    "upstream_response": upstream,
-                }
-                data = json.dumps(out, ensure_ascii=False).encode("utf-8")
-                log_event(
-                    {
-                        "event": "route",
-                        "target": target_key,
-                        "endpoint": target_url,
-                        "len_prompt": len(prompt),
-                        "elapsed_s": dt,
-                    }
-                )
-                return self._send_json(200, data)
+# HTTP app
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await CLIENT.aclose()
+    # flush queued route events before the process exits
+    LOG_Q.put(None)
+    await asyncio.to_thread(LOG_WRITER.join, 2)
+
+
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
+
+
+async def _read_payload(request: Request) -> dict:
+    raw = await request.body()
+    return orjson.loads(raw) if raw else {}
+
+
+@app.exception_handler(404)
+async def not_found(request: Request, exc: Exception):
+    return ORJSONResponse(
+        status_code=404,
+        content={"error": "Use POST /evaluate | /route_and_generate | /generate"},
+    )
+
+
+@app.exception_handler(Exception)
+async def internal_error(request: Request, exc: Exception):
+    return ORJSONResponse(status_code=500, content={"error": str(exc)})
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "mode": MODE}
 
-            self.send_error(404, "Use POST /evaluate | /route_and_generate | /generate")
-        except Exception as e:
-            msg = {"error": str(e)}
-            data = json.dumps(msg, ensure_ascii=False).encode("utf-8")
-            self._send_json(500, data)
 
-    def _send_json(self, status, data: bytes):
-        self.send_response(status)
-        self.send_header("Content-Type", "application/json")
-        self.send_header("Content-Length", str(len(data)))
-        self.end_headers()
-        self.wfile.write(data)
+@app.post("/evaluate")
+async def evaluate(request: Request):
+    payload = await _read_payload(request)
+    result = evaluate_choice(payload.get("prompt", ""), payload.get("model"))
+    return {"evaluator": result}
 
-    def log_message(self, fmt, *args):
-        # suppress default logging
-        return
+
+@app.post("/route_and_generate")
+async def route_and_generate(request: Request):
+    payload = await _read_payload(request)
+    prompt = payload.get("prompt", "")
+    ev = evaluate_choice(prompt, payload.get("model"))
+    target_key = ev["decision"]["endpoint"]
+    chosen_model = ev["decision"]["model"]
+    default_model = DEFAULT_MODELS.get(target_key)
+    payload["upstream_model"] = chosen_model
+    t0 = time.time()
+    upstream = await forward_generate(ENDPOINTS[target_key], payload, default_model)
+    dt = round(time.time() - t0, 3)
+    log_event(
+        {
+            "event": "route",
+            "target": target_key,
+            "endpoint": ENDPOINTS[target_key],
+            "len_prompt": len(prompt),
+            "elapsed_s": dt,
+        }
+    )
+    return {
+        "evaluator": ev,
+        "router": {
+            "mode": MODE,
+            "target": target_key,
+            "endpoint": ENDPOINTS[target_key],
+            "elapsed_s": dt,
+        },
+        "upstream_response": upstream,
+    }
 
 
-class ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
-    daemon_threads = True
-    allow_reuse_address = True
+@app.post("/generate")
+async def generate(request: Request):
+    payload = await _read_payload(request)
+    target_key, target_url = resolve_target(payload)
+    default_model = DEFAULT_MODELS.get(target_key)
+    t0 = time.time()
+    upstream = await forward_generate(target_url, payload, default_model)
+    dt = round(time.time() - t0, 3)
+    log_event(
+        {
+            "event": "route",
+            "target": target_key,
+            "endpoint": target_url,
+            "len_prompt": len(payload.get("prompt", "")),
+            "elapsed_s": dt,
+        }
+    )
+    return {
+        "router": {
+            "mode": MODE,
+            "target": target_key,
+            "endpoint": target_url,
+            "elapsed_s": dt,
+        },
+        "upstream_response": upstream,
+    }
 
 
 if __name__ == "__main__":
-    try:
-        srv = ThreadingHTTPServer((BIND_HOST, BIND_PORT), Handler)
-        print(f"[GAR-ROUTER] listening on http://{BIND_HOST}:{BIND_PORT}  mode={MODE}")
-        srv.serve_forever()
-    except PermissionError as e:
-        print(
-            f"[GAR-ROUTER] bind failed on {BIND_HOST}:{BIND_PORT} — run as Admin or change port. {e}"
-        )
-        sys.exit(1)
+    workers = int(os.environ.get("WORKERS", 1))
+    print(f"[GAR-ROUTER] listening on http://{BIND_HOST}:{BIND_PORT}  mode={MODE}")
+    # multiple workers need an import string instead of the app object
+    uvicorn.run(
+        "gar_router:app" if workers > 1 else app,
+        host=BIND_HOST,
+        port=BIND_PORT,
+        workers=workers,
+        loop="auto",
+        http="auto",
+        access_log=False,
+    )
@@ -14,7 +14,10 @@ into a single, stable script.  Key features:
   the policy allows it.
 * Logs routing events to the configured log file.
 * Forwards generation requests to upstream Ollama instances using only
-  `/api/generate` (no deprecated `/api/chat` fallback).
+  `/api/generate` (no deprecated `/api/chat` fallback).  Requests with
+  `"stream": true` are relayed as NDJSON while the model is generating.
+* Serves HTTP on asyncio (aiohttp): upstream calls are awaited on one shared
+  client session, so in-flight generations do not each hold a thread.
 
 This script is intended to replace the existing `gar_router.py`.  Ensure that
 the `router.yaml` configuration file is up to date and that each alias in the
@@ -23,26 +26,33 @@ instance.
 """
 
 import argparse
-import json
-import socketserver
+import asyncio
+import functools
+import queue
+import re
 import sys
+import threading
 import time
 import os
-from http.server import BaseHTTPRequestHandler, HTTPServer
-from typing import Dict, Tuple, Any
+from pathlib import Path
+from typing import AsyncIterator, Callable, Dict, List, Set, Tuple, Any
 
-import yaml
-import requests
+import aiohttp
+import orjson
+from aiohttp import web
 
+try:
+    import ahocorasick  # pyahocorasick (optional)
+except ImportError:
+    ahocorasick = None
 
-# ---------------------------------------------------------------------------
-# Configuration loading
-# ---------------------------------------------------------------------------
+try:
+    import uvloop  # libuv event loop (optional; not available on Windows)
+except ImportError:
+    uvloop = None  # type: ignore[assignment]
 
-def load_config(cfg_path: str) -> Dict[str, Any]:
-    """Load YAML configuration from disk."""
-    with open(cfg_path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from garvis_config import load_cfg  # noqa: E402
 
 
 # parse CLI arg for config path
@@ -51,14 +61,15 @@ parser.add_argument("--config", default=r"D:\GARVIS\router\router.yaml",
                     help="Path to router.yaml configuration file")
 args = parser.parse_args()
 
-# Load configuration
-CFG = load_config(args.config)
+# Load configuration (JSON sidecar cache, reused while router.yaml is unchanged)
+CFG = load_cfg(args.config)
 
 # Extract top‑level settings with sensible defaults
 MODE      = CFG.get("router", {}).get("mode", "heuristic")
 BIND_HOST = CFG.get("router", {}).get("bind_host", "127.0.0.1")
 BIND_PORT = int(CFG.get("router", {}).get("bind_port", 28100))
 TIMEOUT_S = int(CFG.get("router", {}).get("request_timeout_s", 300))
+CONNECT_TIMEOUT_S = float(CFG.get("router", {}).get("connect_timeout_s", 5))
 LOG_PATH  = CFG.get("router", {}).get("log_path", "router.log")
 
 ENDPOINTS      = CFG.get("endpoints", {})
@@ -70,21 +81,106 @@ HARDWARE  = CFG.get("hardware", {})
 INVENTORY = CFG.get("inventory", {})
 POLICY    = CFG.get("policy", {})
 
+# Request-independent routing tables, derived once from the config
+KEYWORD_TARGETS = tuple(KEYWORDS)
+MIN_CTX_MARGIN  = float(POLICY.get("min_ctx_margin", 0.2))
+HW_VRAM         = {k: (v or {}).get("vram_gb", 0) for k, v in HARDWARE.items()}
+# estimated seconds for a 150-token reply per endpoint (unknown: 10 tok/s)
+LATENCY_BY_HW   = {k: round(150 / max(1, (v or {}).get("est_tok_s", 10)), 2) for k, v in HARDWARE.items()}
+DEFAULT_LATENCY_S = 15.0
+# (alias, endpoint, max_prompt_tokens, vram_req_gb, strengths) per inventory
+# entry; a prompt fits when prompt_tokens < max_prompt_tokens, i.e.
+# prompt_tokens * (1 + margin) < ctx_tokens
+InventoryRow = Tuple[str, str, float, float, frozenset]
+INVENTORY_FLAT: Tuple[InventoryRow, ...] = tuple(
+    (
+        mkey,
+        meta["endpoint"],
+        meta.get("params", {}).get("ctx_tokens", 4096) / (1 + MIN_CTX_MARGIN),
+        meta.get("params", {}).get("vram_req_gb", 0),
+        frozenset(meta.get("params", {}).get("strengths", [])),
+    )
+    for mkey, meta in INVENTORY.items()
+)
+INVENTORY_ROWS = {row[0]: row for row in INVENTORY_FLAT}
+INVENTORY_POS  = {row[0]: i for i, row in enumerate(INVENTORY_FLAT)}
+# candidate shortlist per set of preferred strengths ("reasoning"/"coding"
+# matched in the prompt); the empty set means no preference: all entries.
+# Each shortlist is sorted by estimated latency (stable, so inventory order
+# breaks ties), making the first row that fits the best choice.
+CANDS_BY_PREFER: Dict[frozenset, Tuple[InventoryRow, ...]] = {
+    prefer: tuple(sorted(
+        (row for row in INVENTORY_FLAT if not prefer or not prefer.isdisjoint(row[4])),
+        key=lambda row: LATENCY_BY_HW.get(row[1], DEFAULT_LATENCY_S),
+    ))
+    for prefer in (
+        frozenset(),
+        frozenset({"reasoning"}),
+        frozenset({"coding"}),
+        frozenset({"reasoning", "coding"}),
+    )
+}
+
 # Ensure log directory exists
 os.makedirs(os.path.dirname(LOG_PATH), exist_ok=True)
 
 
+# Log lines are queued by request handlers and appended by one writer thread:
+# up to LOG_BATCH lines (or LOG_FLUSH_S worth of them) per os.write on a
+# long-lived O_APPEND descriptor.  A None item stops the writer.
+LOG_BATCH   = 256
+LOG_FLUSH_S = 0.005
+LOG_Q: "queue.SimpleQueue[bytes | None]" = queue.SimpleQueue()
+LOG_FD = os.open(LOG_PATH, os.O_WRONLY | os.O_CREAT | os.O_APPEND | getattr(os, "O_BINARY", 0), 0o644)
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+def _log_worker() -> None:
+    while True:
+        line = LOG_Q.get()
+        if line is None:
+            return
+        batch = [line]
+        deadline = time.monotonic() + LOG_FLUSH_S
+        stop = False
+        while len(batch) < LOG_BATCH:
+            try:
+                line = LOG_Q.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if line is None:
+                stop = True
+                break
+            batch.append(line)
+        try:
+            _write_all(LOG_FD, b"".join(batch))
+        except OSError as e:
+            # drop this batch but keep draining, or LOG_Q would grow forever
+            print(f"[GAR-ROUTER] log write failed: {e}", file=sys.stderr)
+        if stop:
+            return
+
+
+LOG_WRITER = threading.Thread(target=_log_worker, name="router-log", daemon=True)
+LOG_WRITER.start()
+
+
 def log_event(ev: Dict[str, Any]) -> None:
-    """Append a JSON log entry to the router log."""
+    """Queue a JSON log entry for the router log (never blocks on disk)."""
     ev["ts"] = time.strftime("%Y-%m-%dT%H:%M:%S%z")
-    with open(LOG_PATH, "a", encoding="utf-8") as f:
-        f.write(json.dumps(ev, ensure_ascii=False) + "\n")
+    LOG_Q.put(orjson.dumps(ev) + b"\n")
 
 
 # ---------------------------------------------------------------------------
 # Utility functions
 # ---------------------------------------------------------------------------
 
+@functools.lru_cache(maxsize=256)
 def _normalize_alias(alias: str | None) -> str | None:
     """Strip a trailing ":latest" from a model alias, if present."""
     if not alias:
@@ -94,15 +190,61 @@ def _normalize_alias(alias: str | None) -> str | None:
     return alias
 
 
+def _keyword_scanner(words: List[str]) -> Callable[[str], Set[str]]:
+    """
+    Build a matcher returning the set of ``words`` occurring in a text, scanning
+    the text once for all of them: an Aho-Corasick automaton when pyahocorasick
+    is installed, otherwise one precompiled regex.
+    """
+    words = sorted({w for w in words if w}, key=len, reverse=True)
+    if not words:
+        return lambda text: set()
+
+    if ahocorasick is not None:
+        automaton = ahocorasick.Automaton()
+        for w in words:
+            automaton.add_word(w, w)
+        automaton.make_automaton()
+        return lambda text: {w for _, w in automaton.iter(text)}
+
+    # the lookahead finds the longest keyword starting at each position;
+    # shorter keywords inside it are added back via ``covers``
+    pattern = re.compile("(?=(" + "|".join(map(re.escape, words)) + "))")
+    covers = {w: frozenset(k for k in words if k in w) for w in words}
+
+    def scan(text: str) -> Set[str]:
+        found = set(pattern.findall(text))
+        return set().union(*(covers[w] for w in found)) if found else set()
+
+    return scan
+
+
+# keyword -> labels it counts towards: endpoint keys from KEYWORDS, plus
+# "prefer:reasoning" / "prefer:coding" from the routing policy
+KEYWORD_LABELS: Dict[str, List[str]] = {}
+for _target, _kws in KEYWORDS.items():
+    for _kw in _kws:
+        KEYWORD_LABELS.setdefault(_kw, []).append(_target)
+for _kind in ("reasoning", "coding"):
+    for _kw in map(str.lower, POLICY.get(f"prefer_{_kind}_for", [])):
+        KEYWORD_LABELS.setdefault(_kw, []).append(f"prefer:{_kind}")
+SCAN_KEYWORDS = _keyword_scanner(list(KEYWORD_LABELS))
+
+
+def _keyword_labels(text: str) -> List[str]:
+    """Labels of all keywords found in ``text``, once per matching keyword."""
+    return [label for kw in SCAN_KEYWORDS(text) for label in KEYWORD_LABELS[kw]]
+
+
 def pick_by_keywords(prompt: str) -> str:
     """Pick an endpoint key based on keyword heuristics."""
-    p = (prompt or "").lower()
-    scores = {k: 0 for k in KEYWORDS.keys()}
-    for target, kws in KEYWORDS.items():
-        for kw in kws:
-            if kw in p:
-                scores[target] += 1
-    return max(scores, key=lambda k: scores[k]) if any(scores.values()) else "gpu0"
+    labels = _keyword_labels((prompt or "").lower())
+    best, best_score = "gpu0", 0
+    for target in KEYWORD_TARGETS:
+        score = labels.count(target)
+        if score > best_score:
+            best, best_score = target, score
+    return best
 
 
 def resolve_target(payload: Dict[str, Any]) -> Tuple[str, str]:
@@ -120,42 +262,121 @@ def resolve_target(payload: Dict[str, Any]) -> Tuple[str, str]:
     return key, ENDPOINTS[key]
 
 
-def _post_json(url: str, body: Dict[str, Any]) -> Dict[str, Any]:
-    r = requests.post(url, json=body, timeout=TIMEOUT_S)
-    r.raise_for_status()
-    return json.loads(r.content.decode("utf-8", errors="replace"))
+# Shared upstream client session; created on app startup (aiohttp sessions
+# must be bound to the running loop) and closed on shutdown.
+SESSION: aiohttp.ClientSession | None = None
+# no total cap: a long generation may stream for as long as tokens keep
+# coming; only a slow connect or TIMEOUT_S without any data times out
+UPSTREAM_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=CONNECT_TIMEOUT_S, sock_read=TIMEOUT_S)
+JSON_HEADERS = {"Content-Type": "application/json"}
 
+# /api/generate URL per configured endpoint, formatted once
+GENERATE_URLS: Dict[str, str] = {url: f"{url}/api/generate" for url in ENDPOINTS.values()}
 
-def forward_generate(base_url: str, payload: Dict[str, Any], default_model: str | None) -> Dict[str, Any]:
-    """
-    Forward a /generate request to an upstream Ollama instance.  Only /api/generate
-    is used; this function will not attempt a fallback to /api/chat.  If the
-    requested model is an alias, it will be mapped to the real model via the
-    inventory.
-    """
+
+async def _post_json(url: str, body: Dict[str, Any]) -> bytes:
+    """POST ``body`` and return the raw JSON reply; it is relayed without decoding."""
+    assert SESSION is not None, "client session not started"
+    async with SESSION.post(url, data=orjson.dumps(body), headers=JSON_HEADERS,
+                            timeout=UPSTREAM_TIMEOUT) as r:
+        r.raise_for_status()
+        return await r.read()
+
+
+def _generate_request(base_url: str, payload: Dict[str, Any], default_model: str | None,
+                      stream: bool) -> Tuple[str, Dict[str, Any]]:
+    """Build the upstream /api/generate URL and body, mapping aliases to real models."""
     chosen_model = payload.get("upstream_model") or payload.get("model") or default_model or ""
     real_model = chosen_model
     if real_model and real_model in INVENTORY:
         real_model = INVENTORY[real_model]["params"].get("real_model", real_model)
     prompt = payload.get("prompt", "")
 
-    gen_body = {"prompt": prompt, "stream": False}
+    gen_body = {"prompt": prompt, "stream": stream}
     if real_model:
         gen_body["model"] = real_model
-    return _post_json(f"{base_url}/api/generate", gen_body)
+    url = GENERATE_URLS.get(base_url) or f"{base_url}/api/generate"
+    return url, gen_body
 
 
-def estimate_tokens(text: str) -> int:
-    return max(1, int(len(text or "") / 4))
+async def forward_generate(base_url: str, payload: Dict[str, Any], default_model: str | None) -> bytes:
+    """
+    Forward a /generate request to an upstream Ollama instance.  Only /api/generate
+    is used; this function will not attempt a fallback to /api/chat.  If the
+    requested model is an alias, it will be mapped to the real model via the
+    inventory.  Returns the upstream JSON body as raw bytes.
+    """
+    url, gen_body = _generate_request(base_url, payload, default_model, stream=False)
+    return await _post_json(url, gen_body)
+
+
+STREAM_CHUNK = 16384
+
+
+async def stream_generate(request: web.Request, base_url: str, payload: Dict[str, Any],
+                          default_model: str | None,
+                          head: Dict[str, Any] | None = None) -> web.StreamResponse:
+    """
+    Streaming variant of forward_generate: upstream NDJSON chunks are relayed to
+    the client as they arrive (chunked transfer), never buffered whole.  ``head``,
+    if given, is written first as its own NDJSON line.  A failure after the
+    response has started is reported as a final {"error": ...} line.
+    """
+    assert SESSION is not None, "client session not started"
+    url, gen_body = _generate_request(base_url, payload, default_model, stream=True)
+    async with SESSION.post(url, data=orjson.dumps(gen_body), headers=JSON_HEADERS,
+                            timeout=UPSTREAM_TIMEOUT) as r:
+        r.raise_for_status()
+        resp = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await resp.prepare(request)
+        request["stream_response"] = resp  # headers are out: see errors()
+        try:
+            if head is not None:
+                await resp.write(orjson.dumps(head) + b"\n")
+            async for chunk in r.content.iter_chunked(STREAM_CHUNK):
+                await resp.write(chunk)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            await resp.write(orjson.dumps({"error": str(e)}) + b"\n")
+    await resp.write_eof()
+    return resp
 
 
-def fits_context(prompt_tokens: int, ctx_tokens: int, margin: float) -> bool:
-    return prompt_tokens * (1 + margin) < ctx_tokens
+def estimate_tokens(text: str) -> int:
+    """~4 characters per token, at least 1; callers pass a str (``prompt or ""``)."""
+    return (len(text) >> 2) or 1
 
 
-def est_latency_s(hw_key: str, out_tokens: int = 150) -> float:
-    tok_s = HARDWARE.get(hw_key, {}).get("est_tok_s", 10)
-    return round(out_tokens / max(1, tok_s), 2)
+@functools.lru_cache(maxsize=4096)
+def _decide(hint: str | None, prefer: frozenset, ptoks: int) -> Tuple[str, str, str, float]:
+    """
+    Pure routing core: (model, endpoint, reason, est_latency_s) for an inventory
+    hint (or None), the preferred strengths and the prompt size.  The prompt
+    only matters through ``prefer`` and ``ptoks``, so the cache key stays small
+    however long the prompt is; the config is fixed for the process lifetime.
+    """
+    candidates: Tuple[InventoryRow, ...]
+    if hint is not None:
+        candidates = (INVENTORY_ROWS[hint],)
+    else:
+        candidates = CANDS_BY_PREFER[prefer]
+
+    # apply context/vram constraints; candidates are latency-sorted, so the
+    # first one that fits has the lowest estimated latency
+    for mkey, hw, max_ptoks, vram_req, _ in candidates:
+        if ptoks < max_ptoks and vram_req <= HW_VRAM.get(hw, 0):
+            return (mkey, hw, "Chosen by strengths/context and lowest est. latency.",
+                    LATENCY_BY_HW.get(hw, DEFAULT_LATENCY_S))
+
+    if POLICY.get("allow_cpu", True) and "cpu" in ENDPOINTS:
+        return ("gar-router:latest", "cpu", "No GPU candidate fits; fallback to CPU.",
+                LATENCY_BY_HW.get("cpu", DEFAULT_LATENCY_S))
+    if candidates:
+        # "first available" is first in inventory order, not by latency
+        mkey, hw = min(candidates, key=lambda row: INVENTORY_POS[row[0]])[:2]
+        return (mkey, hw, "No perfect fit; choosing first available.",
+                LATENCY_BY_HW.get(hw, DEFAULT_LATENCY_S))
+    return ("gar-router:latest", "cpu", "No candidates at all; defaulting to CPU.",
+            LATENCY_BY_HW.get("cpu", DEFAULT_LATENCY_S))
 
 
 def evaluate_choice(prompt: str, hint_model: str | None = None) -> Dict[str, Any]:
@@ -165,66 +386,21 @@ def evaluate_choice(prompt: str, hint_model: str | None = None) -> Dict[str, Any
     alias and endpoint keys.  Does not pick tiers; instead we rely on the
     inventory's real_model and vram/ctx_tokens fields for constraints.
     """
+    prompt = prompt or ""
     ptoks = estimate_tokens(prompt)
-    margin = float(POLICY.get("min_ctx_margin", 0.2))
-
-    candidates = []
     nm = _normalize_alias(hint_model)
-    if nm and nm in INVENTORY:
-        meta = INVENTORY[nm]
-        candidates.append((nm, meta["endpoint"], meta))
-    else:
-        p = (prompt or "").lower()
-        prefer: list[str] = []
-        if any(k in p for k in POLICY.get("prefer_reasoning_for", [])):
-            prefer.append("reasoning")
-        if any(k in p for k in POLICY.get("prefer_coding_for", [])):
-            prefer.append("coding")
-        for mkey, meta in INVENTORY.items():
-            strengths = meta.get("params", {}).get("strengths", [])
-            if not prefer or any(s in strengths for s in prefer):
-                candidates.append((mkey, meta["endpoint"], meta))
-
-    # apply context/vram constraints
-    filtered: list[Tuple[str, str, Dict[str, Any]]] = []
-    for mkey, hw, meta in candidates:
-        params = meta.get("params", {})
-        ctx_ok = fits_context(ptoks, params.get("ctx_tokens", 4096), margin)
-        vram_ok = params.get("vram_req_gb", 0) <= HARDWARE.get(hw, {}).get("vram_gb", 0)
-        if ctx_ok and vram_ok:
-            filtered.append((mkey, hw, meta))
-
-    if not filtered:
-        if POLICY.get("allow_cpu", True) and "cpu" in ENDPOINTS:
-            return {
-                "decision": {"model": "gar-router:latest", "endpoint": "cpu"},
-                "reason": "No GPU candidate fits; fallback to CPU.",
-                "est_latency_s": est_latency_s("cpu"),
-                "constraints": {"prompt_tokens": ptoks, "ctx_margin": margin},
-            }
-        if candidates:
-            mkey, hw, meta = candidates[0]
-            return {
-                "decision": {"model": mkey, "endpoint": hw},
-                "reason": "No perfect fit; choosing first available.",
-                "est_latency_s": est_latency_s(hw),
-                "constraints": {"prompt_tokens": ptoks, "ctx_margin": margin},
-            }
-        return {
-            "decision": {"model": "gar-router:latest", "endpoint": "cpu"},
-            "reason": "No candidates at all; defaulting to CPU.",
-            "est_latency_s": est_latency_s("cpu"),
-            "constraints": {"prompt_tokens": ptoks, "ctx_margin": margin},
-        }
+    hint = nm if nm and nm in INVENTORY_ROWS else None
+    prefer: frozenset = frozenset()
+    if hint is None:
+        labels = _keyword_labels(prompt.lower())
+        prefer = frozenset(k for k in ("reasoning", "coding") if f"prefer:{k}" in labels)
 
-    # pick the candidate with the lowest estimated latency
-    best = sorted(filtered, key=lambda t: est_latency_s(t[1]))[0]
-    mkey, hw, meta = best
+    mkey, hw, reason, est = _decide(hint, prefer, ptoks)
     return {
         "decision": {"model": mkey, "endpoint": hw},
-        "reason": "Chosen by strengths/context and lowest est. latency.",
-        "est_latency_s": est_latency_s(hw),
-        "constraints": {"prompt_tokens": ptoks, "ctx_margin": margin},
+        "reason": reason,
+        "est_latency_s": est,
+        "constraints": {"prompt_tokens": ptoks, "ctx_margin": MIN_CTX_MARGIN},
     }
 
 
@@ -232,110 +408,169 @@ def evaluate_choice(prompt: str, hint_model: str | None = None) -> Dict[str, Any
 # HTTP server
 # ---------------------------------------------------------------------------
 
+USAGE = "Use POST /evaluate | /route_and_generate | /generate"
 
-class Handler(BaseHTTPRequestHandler):
-    def do_POST(self) -> None:
-        try:
-            length = int(self.headers.get("Content-Length", "0"))
-            raw = self.rfile.read(length)
-            payload: Dict[str, Any] = json.loads(raw.decode("utf-8", errors="replace")) if raw else {}
-            prompt: str = payload.get("prompt", "")
-
-            if self.path == "/evaluate":
-                hint_model = payload.get("model")
-                result = evaluate_choice(prompt, hint_model)
-                data = json.dumps({"evaluator": result}, ensure_ascii=False).encode("utf-8")
-                return self._send_json(200, data)
-
-            if self.path == "/route_and_generate":
-                hint_model = payload.get("model")
-                ev = evaluate_choice(prompt, hint_model)
-                target_key = ev["decision"]["endpoint"]
-                chosen_model = ev["decision"]["model"]
-                default_model = DEFAULT_MODELS.get(target_key)
-                # propagate alias as upstream_model; real model mapping happens in forward_generate
-                payload["upstream_model"] = chosen_model
-                t0 = time.time()
-                upstream = forward_generate(ENDPOINTS[target_key], payload, default_model)
-                dt = round(time.time() - t0, 3)
-                out = {
-                    "evaluator": ev,
-                    "router": {
-                        "mode": MODE,
-                        "target": target_key,
-                        "endpoint": ENDPOINTS[target_key],
-                        "elapsed_s": dt,
-                    },
-                    "upstream_response": upstream,
-                }
-                data = json.dumps(out, ensure_ascii=False).encode("utf-8")
-                log_event(
-                    {
-                        "event": "route",
-                        "target": target_key,
-                        "endpoint": ENDPOINTS[target_key],
-                        "len_prompt": len(prompt),
-                        "elapsed_s": dt,
-                    }
-                )
-                return self._send_json(200, data)
-
-            if self.path == "/generate":
-                target_key, target_url = resolve_target(payload)
-                default_model = DEFAULT_MODELS.get(target_key)
-                t0 = time.time()
-                upstream = forward_generate(target_url, payload, default_model)
-                dt = round(time.time() - t0, 3)
-                out = {
-                    "router": {
-                        "mode": MODE,
-                        "target": target_key,
-                        "endpoint": target_url,
-                        "elapsed_s": dt,
-                    },
-                    "upstream_response": upstream,
-                }
-                data = json.dumps(out, ensure_ascii=False).encode("utf-8")
-                log_event(
-                    {
-                        "event": "route",
-                        "target": target_key,
-                        "endpoint": target_url,
-                        "len_prompt": len(prompt),
-                        "elapsed_s": dt,
-                    }
-                )
-                return self._send_json(200, data)
-
-            # Unknown path
-            self.send_error(404, "Use POST /evaluate | /route_and_generate | /generate")
-        except Exception as e:
-            msg = {"error": str(e)}
-            data = json.dumps(msg, ensure_ascii=False).encode("utf-8")
-            return self._send_json(500, data)
-
-    def _send_json(self, status: int, data: bytes) -> None:
-        self.send_response(status)
-        self.send_header("Content-Type", "application/json")
-        self.send_header("Content-Length", str(len(data)))
-        self.end_headers()
-        self.wfile.write(data)
-
-    def log_message(self, fmt: str, *args: Any) -> None:
-        # suppress default logging
-        return
-
-
-class ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
-    daemon_threads = True
-    allow_reuse_address = True
+
+def _json_response(status: int, obj: Dict[str, Any]) -> web.Response:
+    return web.Response(status=status, body=orjson.dumps(obj), content_type="application/json")
+
+
+_Fragment = getattr(orjson, "Fragment", None)  # orjson >= 3.9
+
+
+def _envelope_response(head: Dict[str, Any], upstream: bytes) -> web.Response:
+    """
+    JSON response of ``head`` plus ``"upstream_response"``, splicing the raw
+    upstream bytes in as-is instead of decoding and re-encoding them.
+    """
+    upstream = upstream or b"null"
+    if _Fragment is not None:
+        body = orjson.dumps({**head, "upstream_response": _Fragment(upstream)})
+    else:
+        body = orjson.dumps(head)[:-1] + b',"upstream_response":' + upstream + b"}"
+    return web.Response(status=200, body=body, content_type="application/json")
+
+
+async def _read_payload(request: web.Request) -> Dict[str, Any]:
+    raw = await request.read()
+    return orjson.loads(raw) if raw else {}
+
+
+async def evaluate(request: web.Request) -> web.Response:
+    payload = await _read_payload(request)
+    result = evaluate_choice(payload.get("prompt", ""), payload.get("model"))
+    return _json_response(200, {"evaluator": result})
+
+
+async def route_and_generate(request: web.Request) -> web.StreamResponse:
+    payload = await _read_payload(request)
+    prompt: str = payload.get("prompt", "")
+    ev = evaluate_choice(prompt, payload.get("model"))
+    target_key = ev["decision"]["endpoint"]
+    chosen_model = ev["decision"]["model"]
+    default_model = DEFAULT_MODELS.get(target_key)
+    # propagate alias as upstream_model; real model mapping happens in forward_generate
+    payload["upstream_model"] = chosen_model
+    t0 = time.time()
+    if payload.get("stream"):
+        # evaluator decision goes out as the first line, then the model output
+        resp = await stream_generate(request, ENDPOINTS[target_key], payload, default_model,
+                                     head={"evaluator": ev})
+    else:
+        upstream = await forward_generate(ENDPOINTS[target_key], payload, default_model)
+    dt = round(time.time() - t0, 3)
+    log_event(
+        {
+            "event": "route",
+            "target": target_key,
+            "endpoint": ENDPOINTS[target_key],
+            "len_prompt": len(prompt),
+            "elapsed_s": dt,
+        }
+    )
+    if payload.get("stream"):
+        return resp
+    return _envelope_response(
+        {
+            "evaluator": ev,
+            "router": {
+                "mode": MODE,
+                "target": target_key,
+                "endpoint": ENDPOINTS[target_key],
+                "elapsed_s": dt,
+            },
+        },
+        upstream,
+    )
+
+
+async def generate(request: web.Request) -> web.StreamResponse:
+    payload = await _read_payload(request)
+    target_key, target_url = resolve_target(payload)
+    default_model = DEFAULT_MODELS.get(target_key)
+    t0 = time.time()
+    if payload.get("stream"):
+        resp = await stream_generate(request, target_url, payload, default_model)
+    else:
+        upstream = await forward_generate(target_url, payload, default_model)
+    dt = round(time.time() - t0, 3)
+    log_event(
+        {
+            "event": "route",
+            "target": target_key,
+            "endpoint": target_url,
+            "len_prompt": len(payload.get("prompt", "")),
+            "elapsed_s": dt,
+        }
+    )
+    if payload.get("stream"):
+        return resp
+    return _envelope_response(
+        {
+            "router": {
+                "mode": MODE,
+                "target": target_key,
+                "endpoint": target_url,
+                "elapsed_s": dt,
+            },
+        },
+        upstream,
+    )
+
+
+@web.middleware
+async def errors(request: web.Request, handler: Any) -> web.StreamResponse:
+    """
+    Map unknown paths to a usage hint and failures to a JSON 500.  Client
+    disconnects and cancellation propagate, as does any failure after a stream
+    response has been prepared: its status line is already sent.
+    """
+    try:
+        return await handler(request)
+    except (web.HTTPNotFound, web.HTTPMethodNotAllowed):
+        return _json_response(404, {"error": USAGE})
+    except (ConnectionResetError, asyncio.CancelledError):
+        raise
+    except Exception as e:
+        resp = request.get("stream_response")
+        if resp is not None and resp.prepared:
+            raise
+        return _json_response(500, {"error": str(e)})
+
+
+async def client_session(app: web.Application) -> AsyncIterator[None]:
+    global SESSION
+    # one pooled session: keep-alive connections to each Ollama instance
+    SESSION = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=0, limit_per_host=64, keepalive_timeout=60)
+    )
+    yield
+    await SESSION.close()
+
+
+async def flush_log(app: web.Application) -> None:
+    # write out queued route events before the process exits
+    LOG_Q.put(None)
+    await asyncio.to_thread(LOG_WRITER.join, 2)
+
+
+def make_app() -> web.Application:
+    app = web.Application(middlewares=[errors])
+    app.cleanup_ctx.append(client_session)
+    app.on_cleanup.append(flush_log)
+    app.router.add_post("/evaluate", evaluate)
+    app.router.add_post("/route_and_generate", route_and_generate)
+    app.router.add_post("/generate", generate)
+    return app
 
 
 if __name__ == "__main__":
+    if uvloop is not None:
+        # run_app creates its loop through the policy, so this swaps in uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
     try:
-        srv = ThreadingHTTPServer((BIND_HOST, BIND_PORT), Handler)
         print(f"[GAR-ROUTER] listening on http://{BIND_HOST}:{BIND_PORT}  mode={MODE}")
-        srv.serve_forever()
+        web.run_app(make_app(), host=BIND_HOST, port=BIND_PORT, print=None, access_log=None)
     except PermissionError as e:
         print(f"[GAR-ROUTER] bind failed on {BIND_HOST}:{BIND_PORT} — run as Admin or change port. {e}")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
@@ -1,16 +1,34 @@
 import argparse
-import json
 from pathlib import Path
 
+import orjson
+
+try:
+    import ijson  # streaming parser (optional)
+except ImportError:
+    ijson = None
+
 
 def load_artifacts(path: Path):
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return orjson.loads(path.read_bytes())
+
+
+def iter_artifacts(path: Path):
+    """Yield artifacts one by one without holding the whole file in memory.
+
+    Falls back to loading the file at once when ijson is not installed.
+    """
+    if ijson is None:
+        yield from load_artifacts(path)
+        return
+    with open(path, "rb") as f:
+        yield from ijson.items(f, "item", use_float=True)
 
 
 def save_artifacts(path: Path, artifacts):
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(artifacts, f, indent=2, sort_keys=True)
+    path.write_bytes(
+        orjson.dumps(artifacts, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS)
+    )
 
 
 def deduplicate(artifacts):
@@ -27,9 +45,16 @@ def main() -> None:
     parser.add_argument("repository", type=Path, help="Path to artifacts JSON file")
     args = parser.parse_args()
 
-    artifacts = load_artifacts(args.repository)
-    deduped = deduplicate(artifacts)
-    removed = len(artifacts) - len(deduped)
+    total = 0
+
+    def counted(artifacts):
+        nonlocal total
+        for art in artifacts:
+            total += 1
+            yield art
+
+    deduped = deduplicate(counted(iter_artifacts(args.repository)))
+    removed = total - len(deduped)
     save_artifacts(args.repository, deduped)
     print(f"Removed {removed} duplicates. {len(deduped)} artifacts remain.")
 
@@ -4,41 +4,44 @@ from __future__ import annotations
 
 import argparse
 import os
-import subprocess
+import re
+import sys
 from pathlib import Path
 from string import Template
 
+# also importable as a package module when run as scripts/generate_router_config.py
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from scripts.hardware_inventory import cached_hardware  # noqa: E402
 
-def _detect_gpus() -> list[dict[str, str]]:
-    """Return list of GPUs with name and VRAM in GB."""
+# GPU names are substituted into YAML unquoted: letters, digits and a few
+# punctuation marks only, so a name can never add keys or lines
+_GPU_NAME_RE = re.compile(r"[\w .()+/-]{1,64}")
+
+
+def _detect_gpus(refresh: bool = False) -> list[dict[str, str]]:
+    """Return list of GPUs with name and VRAM in GB.
+
+    Uses the per-boot hardware cache, so repeat renders skip ``nvidia-smi``;
+    ``refresh`` probes again. GPUs whose name fails :data:`_GPU_NAME_RE` or
+    whose memory is not a positive integer are left out.
+    """
     try:
-        out = subprocess.check_output(
-            [
-                "nvidia-smi",
-                "--query-gpu=name,memory.total",
-                "--format=csv,noheader",
-            ],
-            stderr=subprocess.DEVNULL,
-            text=True,
-        )
+        hardware = cached_hardware(refresh=refresh)
     except Exception:
         return []
 
-    gpus = []
-    for line in out.strip().splitlines():
-        try:
-            name, mem = [p.strip() for p in line.split(",", 1)]
-            # memory reported like "8192 MiB"
-            mem_mb = int(mem.split()[0])
-            mem_gb = str(int(mem_mb / 1024))
-            gpus.append({"name": name, "vram": mem_gb})
-        except Exception:
-            continue
-    return gpus
+    return [
+        {"name": gpu["name"], "vram": str(gpu["memory_mb"] >> 10)}
+        for gpu in hardware.get("gpus", [])
+        if isinstance(gpu.get("memory_mb"), int)
+        and gpu["memory_mb"] > 0
+        and isinstance(gpu.get("name"), str)
+        and _GPU_NAME_RE.fullmatch(gpu["name"])
+    ]
 
 
-def render(template: Path, output: Path) -> None:
-    gpus = _detect_gpus()
+def render(template: Path, output: Path, refresh: bool = False) -> None:
+    gpus = _detect_gpus(refresh)
 
     env = {
         "CPU_NAME": os.environ.get("CPU_NAME", "CPU"),
@@ -55,6 +58,12 @@ def render(template: Path, output: Path) -> None:
 
     tpl = Template(template.read_text())
     rendered = tpl.safe_substitute(env)
+    # leave an identical file untouched so watchers are not woken on re-runs
+    try:
+        if output.read_text() == rendered:
+            return
+    except OSError:
+        pass
     output.write_text(rendered)
 
 
@@ -62,5 +71,10 @@ if __name__ == "__main__":
     ap = argparse.ArgumentParser(description=__doc__)
     ap.add_argument("template", type=Path, help="Template router.yaml path")
     ap.add_argument("output", type=Path, help="Output config path")
+    ap.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Ignore the per-boot hardware cache and probe the GPUs again",
+    )
     args = ap.parse_args()
-    render(args.template, args.output)
+    render(args.template, args.output, refresh=args.refresh)
@@ -4,121 +4,243 @@
 This script gathers CPU and GPU details from the current machine to help with
 routing and model configuration. Information is collected using native tools
 when available (``nvidia-smi`` for NVIDIA GPUs and ``rocm-smi`` for AMD GPUs).
-On Windows, ``wmic`` is used as a fallback for CPU and GPU information, while
-Linux systems fall back to ``lspci``.
+On Windows, CPU and memory details come from the registry and kernel32, with
+a single PowerShell CIM query as fallback (``wmic`` still lists GPU names),
+while Linux systems fall back to ``lspci`` and read CPU/memory details straight
+from ``/proc``. The independent probes run concurrently.
 
 The collected data is printed as JSON or written to ``--output``.
 """
 from __future__ import annotations
 
 import argparse
+import ctypes
+import functools
 import json
 import os
 import platform
 import re
 import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any, Dict, List
 
+try:
+    import psutil  # optional, gives a portable boot time
+except ImportError:
+    psutil = None
+
+# Parsers match whole tool outputs with these instead of splitting line by line.
+_NVIDIA_RE = re.compile(
+    r"^[ \t]*(\d+)[ \t]*,[ \t]*([^,\n]*?)[ \t]*,[ \t]*(\d+)(?:[ \t][^,\n]*)?$", re.M
+)
+_ROCM_RE = re.compile(r"^[ \t]*(\d+)[ \t]*,[ \t]*(.*?)[ \t]*$", re.M)
+_LSPCI_GPU_RE = re.compile(r"^(?=[^\n]*(?:vga|3d))[^\n]*?: ([^\n]*)$", re.I | re.M)
+_CPUINFO_RE = re.compile(
+    r"^(model name|physical id|cpu cores)\s*:[ \t]*(.*?)[ \t]*$", re.M
+)
+_LSCPU_RE = re.compile(
+    r"^[ \t]*(Model name|Socket\(s\)|Core\(s\) per socket):[ \t]*(.*?)[ \t]*$", re.M
+)
+_MEMTOTAL_RE = re.compile(r"^MemTotal:\s*(\d+)", re.M)
+
+# CPU name/cores and total memory in one PowerShell process, as compact JSON
+_CIM_CPU_CMD = [
+    "powershell",
+    "-NoProfile",
+    "-NonInteractive",
+    "-Command",
+    "$p = Get-CimInstance Win32_Processor | Select-Object -First 1; "
+    "$c = Get-CimInstance Win32_ComputerSystem; "
+    "@{Name = $p.Name; NumberOfCores = $p.NumberOfCores; "
+    "TotalPhysicalMemory = $c.TotalPhysicalMemory} | ConvertTo-Json -Compress",
+]
+
 
 def _run(cmd: List[str]) -> str:
-    """Run *cmd* and return its stdout as text, ignoring errors."""
+    """Run *cmd* and return its stdout as text, ignoring errors.
+
+    Output is decoded as UTF-8 directly rather than through the locale codec;
+    line endings are normalised to ``\\n`` as text mode would.
+    """
     try:
-        return subprocess.check_output(cmd, stderr=subprocess.DEVNULL, text=True)
+        res = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
     except Exception:
         return ""
+    if res.returncode:
+        return ""
+    out = res.stdout.decode("utf-8", "replace")
+    if "\r" in out:
+        out = out.replace("\r\n", "\n").replace("\r", "\n")
+    return out
+
+
+def _read(path: str) -> str:
+    """Return the text of *path*, or an empty string if it cannot be read."""
+    try:
+        return Path(path).read_text(encoding="utf-8", errors="replace")
+    except OSError:
+        return ""
+
+
+def _parse_cpuinfo(text: str) -> Dict[str, Any]:
+    """Extract the CPU name and physical core count from ``/proc/cpuinfo``."""
+    info: Dict[str, Any] = {}
+    sockets = set()
+    cores_per_socket = None
+    for key, value in _CPUINFO_RE.findall(text):
+        if key == "model name":
+            info.setdefault("name", value)
+        elif key == "physical id":
+            sockets.add(value)
+        elif cores_per_socket is None and value.isdigit():
+            cores_per_socket = int(value)
+    if cores_per_socket is not None:
+        info["cores"] = max(1, len(sockets)) * cores_per_socket
+    return info
 
 
 def get_cpu_info() -> Dict[str, Any]:
-    """Return basic CPU information."""
+    """Return basic CPU information (probed once per process)."""
+    return dict(_cpu_info())
+
+
+class _MemoryStatusEx(ctypes.Structure):
+    _fields_ = [
+        ("dwLength", ctypes.c_ulong),
+        ("dwMemoryLoad", ctypes.c_ulong),
+        ("ullTotalPhys", ctypes.c_ulonglong),
+        ("ullAvailPhys", ctypes.c_ulonglong),
+        ("ullTotalPageFile", ctypes.c_ulonglong),
+        ("ullAvailPageFile", ctypes.c_ulonglong),
+        ("ullTotalVirtual", ctypes.c_ulonglong),
+        ("ullAvailVirtual", ctypes.c_ulonglong),
+        ("ullAvailExtendedVirtual", ctypes.c_ulonglong),
+    ]
+
+
+class _LogicalProcessorInfo(ctypes.Structure):
+    # SYSTEM_LOGICAL_PROCESSOR_INFORMATION; the union is not needed here
+    _fields_ = [
+        ("ProcessorMask", ctypes.c_size_t),
+        ("Relationship", ctypes.c_int),
+        ("_union", ctypes.c_ulonglong * 2),
+    ]
+
+
+_RELATION_PROCESSOR_CORE = 0
+
+
+def _windows_cpu_info() -> Dict[str, Any]:
+    """CPU name, physical cores and memory from the registry and kernel32.
+
+    Avoids starting WMI (``wmic``/CIM), which is slow to spin up; whatever
+    cannot be read this way is left out for the caller to fill in.
+    """
+    info: Dict[str, Any] = {}
+    if sys.platform != "win32":
+        return info
+    import winreg
+
+    try:
+        with winreg.OpenKey(
+            winreg.HKEY_LOCAL_MACHINE,
+            r"HARDWARE\DESCRIPTION\System\CentralProcessor\0",
+        ) as key:
+            name = winreg.QueryValueEx(key, "ProcessorNameString")[0]
+            info["name"] = str(name).strip()
+    except OSError:
+        pass
+
+    kernel32 = ctypes.windll.kernel32
+    status = _MemoryStatusEx()
+    status.dwLength = ctypes.sizeof(status)
+    if kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+        info["memory_gb"] = round(status.ullTotalPhys / 1024 / 1024 / 1024, 2)
+
+    size = ctypes.c_ulong(0)
+    kernel32.GetLogicalProcessorInformation(None, ctypes.byref(size))
+    count = size.value // ctypes.sizeof(_LogicalProcessorInfo)
+    buf = (_LogicalProcessorInfo * count)()
+    if count and kernel32.GetLogicalProcessorInformation(buf, ctypes.byref(size)):
+        cores = sum(e.Relationship == _RELATION_PROCESSOR_CORE for e in buf)
+        if cores:
+            info["cores"] = cores
+    return info
+
+
+def _parse_cim_cpu(output: str) -> Dict[str, Any]:
+    """Parse the JSON printed by :data:`_CIM_CPU_CMD`."""
+    try:
+        data = json.loads(output)
+    except ValueError:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    info: Dict[str, Any] = {}
+    if data.get("Name"):
+        info["name"] = str(data["Name"]).strip()
+    if isinstance(data.get("NumberOfCores"), int):
+        info["cores"] = data["NumberOfCores"]
+    if isinstance(data.get("TotalPhysicalMemory"), int):
+        info["memory_gb"] = round(data["TotalPhysicalMemory"] / 1024 / 1024 / 1024, 2)
+    return info
+
+
+@functools.lru_cache(maxsize=1)
+def _cpu_info() -> Dict[str, Any]:
     info: Dict[str, Any] = {
         "architecture": platform.machine(),
     }
 
-    # Logical thread count
-    threads = os.cpu_count()
+    # Logical threads this process may run on (cgroups/taskset can restrict
+    # them below the machine total); sched_getaffinity is not on every OS
+    getaffinity = getattr(os, "sched_getaffinity", None)
+    threads = len(getaffinity(0)) if getaffinity else os.cpu_count()
     if threads is not None:
         info["threads"] = threads
 
     if platform.system() == "Windows":
-        cpu_out = _run(["wmic", "cpu", "get", "Name,NumberOfCores", "/format:csv"])
-        for line in cpu_out.splitlines():
-            line = line.strip()
-            if not line or line.startswith("Node"):
-                continue
-            parts = line.split(",")
-            if len(parts) >= 3:
-                info["name"] = parts[1].strip()
-                try:
-                    info["cores"] = int(parts[2].strip())
-                except ValueError:
-                    pass
-                break
-
-        mem_out = _run(
-            [
-                "wmic",
-                "computersystem",
-                "get",
-                "totalphysicalmemory",
-                "/format:value",
-            ]
-        )
-        match = re.search(r"TotalPhysicalMemory=(\d+)", mem_out)
-        if match:
-            info["memory_gb"] = round(int(match.group(1)) / 1024 / 1024 / 1024, 2)
+        info.update(_windows_cpu_info())
+        if {"name", "cores", "memory_gb"} - info.keys():
+            # one CIM query for whatever the native calls could not provide
+            for key, value in _parse_cim_cpu(_run(_CIM_CPU_CMD)).items():
+                info.setdefault(key, value)
         return info
 
-    lscpu = _run(["lscpu"])
+    info.update(_parse_cpuinfo(_read("/proc/cpuinfo")))
+    # not every architecture reports name/cores in /proc/cpuinfo
+    lscpu = _run(["lscpu"]) if "name" not in info or "cores" not in info else ""
     if lscpu:
-        sockets = cores_per_socket = None
-        for line in lscpu.splitlines():
-            if "Model name" in line:
-                info["name"] = line.split(":", 1)[1].strip()
-            elif "Socket(s):" in line:
-                try:
-                    sockets = int(line.split(":", 1)[1])
-                except ValueError:
-                    pass
-            elif "Core(s) per socket:" in line:
-                try:
-                    cores_per_socket = int(line.split(":", 1)[1])
-                except ValueError:
-                    pass
-        if sockets is not None and cores_per_socket is not None:
-            info["cores"] = sockets * cores_per_socket
-
-    meminfo = _run(["grep", "MemTotal", "/proc/meminfo"])
-    if meminfo:
-        match = re.search(r"(\d+)", meminfo)
-        if match:
-            mem_kb = int(match.group(1))
-            info["memory_gb"] = round(mem_kb / 1024 / 1024, 2)
+        fields = dict(_LSCPU_RE.findall(lscpu))
+        if "Model name" in fields:
+            info.setdefault("name", fields["Model name"])
+        sockets = fields.get("Socket(s)", "")
+        cores_per_socket = fields.get("Core(s) per socket", "")
+        if sockets.isdigit() and cores_per_socket.isdigit():
+            info.setdefault("cores", int(sockets) * int(cores_per_socket))
+
+    match = _MEMTOTAL_RE.search(_read("/proc/meminfo"))
+    if match:
+        mem_kb = int(match.group(1))
+        info["memory_gb"] = round(mem_kb / 1024 / 1024, 2)
 
     return info
 
 
 def parse_nvidia_smi(output: str) -> List[Dict[str, Any]]:
-    """Parse ``nvidia-smi`` CSV output."""
-    gpus: List[Dict[str, Any]] = []
-    for line in output.strip().splitlines():
-        parts = [p.strip() for p in line.split(",")]
-        if len(parts) != 3:
-            continue
-        idx, name, mem = parts
-        try:
-            mem_mb = int(mem.split()[0])
-        except (ValueError, IndexError):
-            continue
-        gpus.append(
-            {
-                "index": int(idx),
-                "vendor": "NVIDIA",
-                "name": name,
-                "memory_mb": mem_mb,
-            }
-        )
-    return gpus
+    """Parse ``nvidia-smi`` CSV output; memory may carry a unit (``MiB``) or not."""
+    return [
+        {
+            "index": int(idx),
+            "vendor": "NVIDIA",
+            "name": name,
+            "memory_mb": int(mem),
+        }
+        for idx, name, mem in _NVIDIA_RE.findall(output)
+    ]
 
 
 def detect_nvidia_gpus() -> List[Dict[str, Any]]:
@@ -126,7 +248,7 @@ def detect_nvidia_gpus() -> List[Dict[str, Any]]:
         [
             "nvidia-smi",
             "--query-gpu=index,name,memory.total",
-            "--format=csv,noheader",
+            "--format=csv,noheader,nounits",
         ]
     )
     if not out:
@@ -136,27 +258,51 @@ def detect_nvidia_gpus() -> List[Dict[str, Any]]:
 
 def parse_rocm_smi(output: str) -> List[Dict[str, Any]]:
     """Parse ``rocm-smi`` CSV output."""
+    header, _, body = output.strip().partition("\n")
+    if "," not in header:
+        return []
+    return [
+        {
+            "index": int(idx),
+            "vendor": "AMD",
+            "name": name,
+            "memory_mb": None,
+        }
+        for idx, name in _ROCM_RE.findall(body)
+    ]
+
+
+def parse_rocm_smi_json(output: str) -> List[Dict[str, Any]]:
+    """Parse ``rocm-smi --showproductname --showmeminfo vram --json`` output."""
+    try:
+        data = json.loads(output)
+    except ValueError:
+        return []
+    if not isinstance(data, dict):
+        return []
     gpus: List[Dict[str, Any]] = []
-    lines = [ln.strip() for ln in output.splitlines() if ln.strip()]
-    if not lines or "," not in lines[0]:
-        return gpus
-    for line in lines[1:]:
-        parts = [p.strip() for p in line.split(",", 1)]
-        if len(parts) != 2:
+    for card, info in data.items():
+        if not card.startswith("card") or not card[4:].isdigit():
             continue
-        idx, name = parts
+        name = info.get("Card series") or info.get("Card Series") or "AMD GPU"
+        vram = str(info.get("VRAM Total Memory (B)", ""))
         gpus.append(
             {
-                "index": int(idx),
+                "index": int(card[4:]),
                 "vendor": "AMD",
                 "name": name,
-                "memory_mb": None,
+                "memory_mb": int(vram) >> 20 if vram.isdigit() else None,
             }
         )
-    return gpus
+    return sorted(gpus, key=lambda gpu: gpu["index"])
 
 
 def detect_amd_gpus() -> List[Dict[str, Any]]:
+    """Detect AMD GPUs, with VRAM when ``rocm-smi`` supports ``--json``."""
+    out = _run(["rocm-smi", "--showproductname", "--showmeminfo", "vram", "--json"])
+    gpus = parse_rocm_smi_json(out) if out else []
+    if gpus:
+        return gpus
     out = _run(["rocm-smi", "--showproductname", "--csv"])
     if not out:
         return []
@@ -182,34 +328,97 @@ def detect_other_gpus() -> List[Dict[str, Any]]:
         return gpus
 
     out = _run(["lspci"])
-    for line in out.splitlines():
-        if re.search(r"vga|3d", line, re.IGNORECASE):
-            try:
-                name = line.split(": ", 1)[1]
-            except IndexError:
-                continue
-            gpus.append(
-                {"index": None, "vendor": "OTHER", "name": name, "memory_mb": None}
-            )
-    return gpus
+    return [
+        {"index": None, "vendor": "OTHER", "name": name, "memory_mb": None}
+        for name in _LSPCI_GPU_RE.findall(out)
+    ]
 
 
 def collect_hardware() -> Dict[str, Any]:
-    """Collect CPU and GPU information."""
-    gpus = detect_nvidia_gpus()
-    if not gpus:
-        gpus = detect_amd_gpus()
-    if not gpus:
-        gpus = detect_other_gpus()
-    return {"cpu": get_cpu_info(), "gpus": gpus}
+    """Collect CPU and GPU information.
+
+    All probes start at once, so the total wait is the slowest tool rather
+    than their sum; GPU results are still preferred NVIDIA, then AMD, then
+    anything ``lspci``/``wmic`` reports.
+    """
+    with ThreadPoolExecutor(max_workers=4) as ex:
+        cpu = ex.submit(get_cpu_info)
+        probes = [
+            ex.submit(detect)
+            for detect in (detect_nvidia_gpus, detect_amd_gpus, detect_other_gpus)
+        ]
+        gpus = next((found for found in (p.result() for p in probes) if found), [])
+        return {"cpu": cpu.result(), "gpus": gpus}
+
+
+def _cache_dir() -> Path:
+    """Per-user cache directory: ``%LOCALAPPDATA%`` on Windows, XDG elsewhere.
+
+    Not the shared temp directory, where another user could plant a cache file
+    that later ends up in a rendered config.
+    """
+    local = os.environ.get("LOCALAPPDATA")
+    if platform.system() == "Windows" and local:
+        return Path(local) / "garvis"
+    return Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "garvis"
+
+
+_CACHE_PATH = _cache_dir() / f"hw_{platform.node()}.json"
+
+
+def _cache_key() -> List[Any] | None:
+    """Identify the current boot; hardware is assumed fixed until reboot."""
+    try:
+        boot = psutil.boot_time() if psutil else os.stat("/proc/1").st_ctime
+    except OSError:
+        return None
+    return [platform.node(), platform.release(), boot]
+
+
+def cached_hardware(refresh: bool = False) -> Dict[str, Any]:
+    """Return :func:`collect_hardware`, reusing the result for this boot.
+
+    The result is stored in the per-user cache directory (mode 0600, in a
+    0700 directory) together with the boot key and recomputed when the key
+    changes, the file is unreadable or ``refresh`` is set. A result without
+    GPUs is not stored: at boot the driver or ``nvidia-smi`` may not be ready
+    yet, and an empty probe must not stick until the next reboot.
+    """
+    key = _cache_key()
+    if key is not None and not refresh:
+        try:
+            cached = json.loads(_CACHE_PATH.read_text())
+            if cached.get("key") == key:
+                return cached["hardware"]
+        except (OSError, ValueError, AttributeError, KeyError):
+            pass
+
+    data = collect_hardware()
+    if key is not None and data["gpus"]:
+        try:
+            _CACHE_PATH.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+            # mkstemp creates the file 0600; os.replace keeps that mode
+            with tempfile.NamedTemporaryFile(
+                "w", dir=_CACHE_PATH.parent, suffix=".tmp", delete=False
+            ) as tmp:
+                json.dump({"key": key, "hardware": data}, tmp)
+            os.replace(tmp.name, _CACHE_PATH)
+        except OSError:
+            pass
+    return data
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description=__doc__)
     parser.add_argument("--output", type=Path, help="Optional output JSON file")
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Ignore the per-boot cache and probe the hardware again",
+    )
     args = parser.parse_args()
 
-    data = collect_hardware()
+    data = cached_hardware(refresh=args.refresh)
     text = json.dumps(data, indent=2)
     if args.output:
         args.output.write_text(text)
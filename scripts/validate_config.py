@@ -1,9 +1,9 @@
 import argparse
-import json
 import os
 from pathlib import Path
 
 import jsonschema
+import orjson
 
 
 def expand_env_variables(obj):
@@ -17,8 +17,7 @@ def expand_env_variables(obj):
 
 
 def load_json(path: Path):
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return orjson.loads(path.read_bytes())
 
 
 def main() -> None:
@@ -87,5 +87,5 @@ for idx in "${!GPU_PORTS[@]}"; do
   check "gpu$idx" "http://127.0.0.1:${GPU_PORTS[$idx]}/api/tags"
 done
 check cpu  "http://127.0.0.1:$CPU_PORT/api/tags"
-check router "http://127.0.0.1:$ROUTER_PORT/evaluate"
+check router "http://127.0.0.1:$ROUTER_PORT/health"
 check evaluator "http://127.0.0.1:$EVAL_PORT/api/tags"
@@ -2,11 +2,18 @@ import importlib
 import sys
 import types
 from pathlib import Path
+from typing import Any, Callable
 from unittest.mock import patch
 
+import fastjsonschema
 import pytest
 import yaml
 
+try:
+    from yaml import CSafeLoader as _Loader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader as _Loader  # type: ignore[assignment]
+
 ROOT = Path(__file__).resolve().parents[1]
 
 
@@ -34,8 +41,62 @@ def router_config_path():
 
 @pytest.fixture(scope="session")
 def router_config(router_config_path):
-    with open(router_config_path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f) or {}
+    # bytes straight to libyaml, which detects the encoding itself
+    with open(router_config_path, "rb") as f:
+        return yaml.load(f, Loader=_Loader) or {}
+
+
+# Minimal router.yaml contract shared by schema tests.
+ROUTER_SCHEMA = {
+    "type": "object",
+    "required": ["endpoints", "keywords", "model_map"],
+    "properties": {
+        "mode": {"type": "string"},
+        "endpoints": {
+            "type": "object",
+            "minProperties": 1,
+            "additionalProperties": {
+                "anyOf": [
+                    {"type": "string"},
+                    {
+                        "type": "object",
+                        "required": ["host", "port"],
+                        "properties": {
+                            "host": {"type": "string"},
+                            "port": {"type": "integer"},
+                            "hardware": {"type": "object"},
+                            "tags": {"type": "array", "items": {"type": "string"}},
+                        },
+                    },
+                ]
+            },
+        },
+        "keywords": {
+            "type": "object",
+            "additionalProperties": {"type": "array", "items": {"type": "string"}},
+        },
+        "model_map": {
+            "type": "object",
+            "additionalProperties": {"type": "string"},
+        },
+        "defaults": {"type": "object"},
+        "inventory": {"type": "object"},
+        "evaluator": {"type": "object"},
+    },
+    "additionalProperties": True,
+}
+
+# Compiled once per session in pytest_configure (raises JsonSchemaException).
+ROUTER_VALIDATOR = pytest.StashKey[Callable[[Any], Any]]()
+
+
+def pytest_configure(config):
+    config.stash[ROUTER_VALIDATOR] = fastjsonschema.compile(ROUTER_SCHEMA)
+
+
+@pytest.fixture(scope="session")
+def router_validator(pytestconfig):
+    return pytestconfig.stash[ROUTER_VALIDATOR]
 
 
 CANDIDATE_FUNCS = [
@@ -58,13 +119,14 @@ def _find_decider(router_module: types.ModuleType):
     )
 
 
-@pytest.fixture(scope="module")
+@pytest.fixture(scope="session")
 def decider(router_module):
     return _find_decider(router_module)
 
 
-@pytest.fixture(scope="module")
+@pytest.fixture(scope="session")
 def mini_config():
+    # built once for the whole run; tests only read it
     return {
         "endpoints": {
             "gpu0": {
@@ -1,12 +1,57 @@
+import json
 from pathlib import Path
 import sys
 
+import httpx
+import pytest
 from fastapi.testclient import TestClient
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 import evaluator.evaluator_proxy as ep
 
 
+DECISION = {"evaluator": {"decision": {"model": "alias", "endpoint": "gpu0"}}}
+
+
+class _Upstream:
+    """Mocked router and Ollama: records every request, decides ``alias`` on
+    /evaluate and answers everything else with ``response``."""
+
+    def __init__(self):
+        self.requests: list[httpx.Request] = []
+        self.response = httpx.Response(200, json={"ok": True})
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if request.url.path == "/evaluate":
+            return httpx.Response(200, json=DECISION)
+        return self.response
+
+    def paths(self) -> list[str]:
+        return [r.url.path for r in self.requests]
+
+
+@pytest.fixture(autouse=True)
+def _fresh_decisions():
+    ep._DECISIONS.clear()
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    monkeypatch.setattr(ep, "ENDPOINTS", {"gpu0": "http://upstream"})
+    monkeypatch.setattr(ep, "INVENTORY", {"alias": {"params": {"real_model": "real"}}})
+    mock = _Upstream()
+    monkeypatch.setattr(
+        ep, "CLIENT", httpx.AsyncClient(transport=httpx.MockTransport(mock))
+    )
+    return mock
+
+
+@pytest.fixture
+def client():
+    return TestClient(ep.app)
+
+
 def test_tags_returns_inventory(monkeypatch):
     monkeypatch.setattr(
         ep,
@@ -21,38 +66,48 @@ def test_tags_returns_inventory(monkeypatch):
             }
         },
     )
-    client = TestClient(ep.app)
-    resp = client.get("/api/tags")
+    resp = TestClient(ep.app).get("/api/tags")
     assert resp.status_code == 200
     data = resp.json()
     assert any(m["name"] == "alias" for m in data["models"])
 
 
-def test_generate_routes_and_proxies(monkeypatch):
-    monkeypatch.setattr(ep, "ENDPOINTS", {"gpu0": "http://upstream"})
-    monkeypatch.setattr(ep, "INVENTORY", {"alias": {"params": {"real_model": "real"}}})
+def test_generate_routes_and_proxies(upstream, client):
+    resp = client.post("/api/generate", json={"prompt": "hi"})
+    assert resp.status_code == 200
+    assert resp.json() == {"ok": True}
+    assert upstream.paths() == ["/evaluate", "/api/generate"]
+    assert json.loads(upstream.requests[-1].content)["model"] == "real"
+
 
-    class Dummy:
-        def __init__(self, payload):
-            self._payload = payload
+def test_generate_streams_upstream_ndjson(upstream, client):
+    chunks = [b'{"response":"a","done":false}\n', b'{"response":"b","done":true}\n']
+    upstream.response = httpx.Response(
+        200,
+        headers={"content-type": "application/x-ndjson"},
+        content=b"".join(chunks),
+    )
+    resp = client.post("/api/generate", json={"prompt": "hi", "stream": True})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "application/x-ndjson"
+    assert resp.content == b"".join(chunks)
 
-        def raise_for_status(self):
-            return None
 
-        def json(self):
-            return self._payload
+def test_generate_reuses_cached_decision(upstream, client):
+    for prompt in ("hi", "hello"):
+        assert client.post("/api/generate", json={"prompt": prompt}).status_code == 200
+    assert upstream.paths().count("/evaluate") == 1
 
-    def fake_post(url, json, timeout):
-        if url.endswith("/evaluate"):
-            return Dummy(
-                {"evaluator": {"decision": {"model": "alias", "endpoint": "gpu0"}}}
-            )
-        assert url.endswith("/api/generate")
-        assert json["model"] == "real"
-        return Dummy({"ok": True})
+    # a larger token estimate may no longer fit the cached choice
+    assert client.post("/api/generate", json={"prompt": "x" * 8}).status_code == 200
+    assert upstream.paths().count("/evaluate") == 2
 
-    monkeypatch.setattr(ep.requests, "post", fake_post)
-    client = TestClient(ep.app)
+
+def test_generate_uses_local_router(upstream, client, monkeypatch):
+    monkeypatch.setattr(
+        ep, "LOCAL_EVALUATE", lambda prompt, model: DECISION["evaluator"]
+    )
     resp = client.post("/api/generate", json={"prompt": "hi"})
     assert resp.status_code == 200
     assert resp.json() == {"ok": True}
+    assert upstream.paths() == ["/api/generate"]
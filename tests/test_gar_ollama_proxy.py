@@ -0,0 +1,117 @@
+import asyncio
+import importlib.util
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+pytest.importorskip("aiohttp")
+pytest.importorskip("orjson")
+from aiohttp import web  # noqa: E402
+from aiohttp.test_utils import make_mocked_request  # noqa: E402
+
+PROXY_PATH = (
+    Path(__file__).resolve().parents[1] / "router" / "logs" / "gar_ollama_proxy.py"
+)
+CHUNKS = [b'{"response":"he","done":false}\n', b'{"response":"llo","done":true}\n']
+
+
+@pytest.fixture(scope="module")
+def proxy(tmp_path_factory):
+    """Import gar_ollama_proxy.py against a throwaway config and log file."""
+    tmp = tmp_path_factory.mktemp("proxy")
+    cfg = tmp / "router.yaml"
+    cfg.write_text(
+        f"router: {{log_path: {(tmp / 'logs' / 'router.jsonl').as_posix()}}}\n"
+        'endpoints: {gpu0: "http://127.0.0.1:9"}\n'
+        "model_map: {gar-chat: gpu0}\n"
+        "inventory:\n"
+        '  gar-chat: {endpoint: gpu0, params: {real_model: "llama"}}\n',
+        encoding="utf-8",
+    )
+    spec = importlib.util.spec_from_file_location("gar_ollama_proxy", PROXY_PATH)
+    module = importlib.util.module_from_spec(spec)
+    with patch.object(sys, "argv", ["gar_ollama_proxy.py", "--config", str(cfg)]):
+        spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+async def ollama(proxy, aiohttp_server, monkeypatch):
+    """Fake Ollama streaming CHUNKS from /api/generate; ``fail`` makes it 500."""
+    state = {"fail": False, "bodies": []}
+
+    async def api_generate(request):
+        state["bodies"].append(await request.json())
+        if state["fail"]:
+            return web.Response(status=500, text="boom")
+        resp = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await resp.prepare(request)
+        for chunk in CHUNKS:
+            await resp.write(chunk)
+        await resp.write_eof()
+        return resp
+
+    app = web.Application()
+    app.router.add_post("/api/generate", api_generate)
+    server = await aiohttp_server(app)
+    monkeypatch.setitem(proxy.ENDPOINTS, "gpu0", str(server.make_url("")).rstrip("/"))
+    return state
+
+
+@pytest.fixture
+async def client(proxy, aiohttp_client):
+    return await aiohttp_client(proxy.make_app())
+
+
+async def test_generate_streams_upstream_ndjson(proxy, ollama, client):
+    r = await client.post(
+        "/generate", json={"model": "gar-chat", "prompt": "hi", "stream": True}
+    )
+    assert r.status == 200
+    assert r.headers["Content-Type"] == "application/x-ndjson"
+    assert await r.read() == b"".join(CHUNKS)
+    assert ollama["bodies"] == [{"prompt": "hi", "stream": True, "model": "llama"}]
+
+
+async def test_generate_upstream_error_is_json_500(proxy, ollama, client):
+    ollama["fail"] = True
+    r = await client.post(
+        "/generate", json={"model": "gar-chat", "prompt": "hi", "stream": True}
+    )
+    assert r.status == 500
+    assert "500" in (await r.json())["error"]
+
+
+async def test_failure_after_stream_started_propagates(proxy):
+    async def handler(request):
+        request["stream_response"] = resp = web.StreamResponse()
+        await resp.prepare(request)
+        raise RuntimeError("log failed")
+
+    # the status line is already sent: no JSON 500 may follow it
+    with pytest.raises(RuntimeError):
+        await proxy.errors(make_mocked_request("POST", "/generate"), handler)
+
+
+@pytest.mark.parametrize("exc", [ConnectionResetError, asyncio.CancelledError])
+async def test_disconnect_propagates(proxy, exc):
+    async def handler(request):
+        raise exc()
+
+    with pytest.raises(exc):
+        await proxy.errors(make_mocked_request("POST", "/generate"), handler)
+
+
+async def test_unknown_path_gets_usage(proxy, client):
+    r = await client.get("/nope")
+    assert r.status == 404
+    assert (await r.json()) == {"error": proxy.USAGE}
+
+
+def test_upstream_timeout_only_limits_idle_reads(proxy):
+    timeout = proxy.UPSTREAM_TIMEOUT
+    assert timeout.total is None
+    assert timeout.sock_connect == proxy.CONNECT_TIMEOUT_S == 5
+    assert timeout.sock_read == proxy.TIMEOUT_S
@@ -0,0 +1,14 @@
+from __future__ import annotations
+
+from scripts import generate_router_config as grc
+
+
+def test_detect_gpus_drops_unsafe_entries(monkeypatch) -> None:
+    gpus = [
+        {"name": "NVIDIA GeForce RTX 4090", "memory_mb": 24564},
+        {"name": "evil\nendpoints: {x: http://attacker}", "memory_mb": 8192},
+        {"name": "NVIDIA L4", "memory_mb": "23034"},
+        {"name": "Intel(R) UHD Graphics", "memory_mb": None},
+    ]
+    monkeypatch.setattr(grc, "cached_hardware", lambda refresh: {"gpus": gpus})
+    assert grc._detect_gpus() == [{"name": "NVIDIA GeForce RTX 4090", "vram": "23"}]
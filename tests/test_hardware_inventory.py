@@ -1,8 +1,21 @@
 from __future__ import annotations
 
+import os
+import stat
+
+import pytest
+
 from scripts import hardware_inventory as hi
 
 
+@pytest.fixture(autouse=True)
+def _fresh_cpu_info():
+    # get_cpu_info is memoized; each test patches the probes differently
+    hi._cpu_info.cache_clear()
+    yield
+    hi._cpu_info.cache_clear()
+
+
 def test_parse_nvidia_smi() -> None:
     sample = "0, NVIDIA A100, 40536 MiB\n1, NVIDIA A100, 40536 MiB\n"
     gpus = hi.parse_nvidia_smi(sample)
@@ -12,13 +25,67 @@ def test_parse_nvidia_smi() -> None:
     ]
 
 
+def test_parse_nvidia_smi_nounits() -> None:
+    gpus = hi.parse_nvidia_smi("3, NVIDIA L4, 23034\n")
+    assert gpus == [
+        {"index": 3, "vendor": "NVIDIA", "name": "NVIDIA L4", "memory_mb": 23034}
+    ]
+
+
 def test_parse_rocm_smi() -> None:
     sample = "GPU ID, GPU Name\n0, gfx1030\n"
     gpus = hi.parse_rocm_smi(sample)
     assert gpus == [{"index": 0, "vendor": "AMD", "name": "gfx1030", "memory_mb": None}]
 
 
+def test_parse_rocm_smi_json() -> None:
+    sample = (
+        '{"card1": {"Card series": "Radeon RX 7900 XTX",'
+        ' "VRAM Total Memory (B)": "25753026560"},'
+        ' "card0": {"Card series": "Instinct MI100",'
+        ' "VRAM Total Memory (B)": "34342961152"},'
+        ' "system": {"Driver version": "6.7.0"}}'
+    )
+    gpus = hi.parse_rocm_smi_json(sample)
+    assert gpus == [
+        {"index": 0, "vendor": "AMD", "name": "Instinct MI100", "memory_mb": 32752},
+        {"index": 1, "vendor": "AMD", "name": "Radeon RX 7900 XTX", "memory_mb": 24560},
+    ]
+
+
 def test_get_cpu_info_linux(monkeypatch) -> None:
+    def fake_read(path: str) -> str:
+        if path == "/proc/cpuinfo":
+            return "".join(
+                f"processor\t: {n}\nmodel name\t: TestCPU\n"
+                "physical id\t: 0\ncpu cores\t: 4\n\n"
+                for n in range(8)
+            )
+        if path == "/proc/meminfo":
+            return "MemTotal:       16384000 kB\nMemFree:         1024 kB\n"
+        return ""
+
+    def fake_run(cmd: list[str]) -> str:  # type: ignore[override]
+        raise AssertionError(f"unexpected command {cmd}")
+
+    monkeypatch.setattr(hi, "_read", fake_read)
+    monkeypatch.setattr(hi, "_run", fake_run)
+    monkeypatch.setattr(hi.platform, "machine", lambda: "x86_64")
+    monkeypatch.setattr(hi.platform, "system", lambda: "Linux")
+    monkeypatch.setattr(hi.os, "cpu_count", lambda: 8)
+    # only 6 of the 8 threads are usable by this process
+    monkeypatch.setattr(
+        hi.os, "sched_getaffinity", lambda pid: set(range(6)), raising=False
+    )
+
+    info = hi.get_cpu_info()
+    assert info["name"] == "TestCPU"
+    assert info["cores"] == 4
+    assert info["threads"] == 6
+    assert info["memory_gb"] == 15.62
+
+
+def test_get_cpu_info_linux_falls_back_to_lscpu(monkeypatch) -> None:
     def fake_run(cmd: list[str]) -> str:  # type: ignore[override]
         if cmd == ["lscpu"]:
             return (
@@ -27,43 +94,117 @@ def test_get_cpu_info_linux(monkeypatch) -> None:
                 "Core(s) per socket: 4\n"
                 "CPU(s): 8\n"
             )
-        if cmd[:2] == ["grep", "MemTotal"]:
-            return "MemTotal:       16384000 kB\n"
         return ""
 
+    monkeypatch.setattr(hi, "_read", lambda path: "processor\t: 0\n")
     monkeypatch.setattr(hi, "_run", fake_run)
-    monkeypatch.setattr(hi.platform, "machine", lambda: "x86_64")
     monkeypatch.setattr(hi.platform, "system", lambda: "Linux")
-    monkeypatch.setattr(hi.os, "cpu_count", lambda: 8)
 
     info = hi.get_cpu_info()
     assert info["name"] == "TestCPU"
     assert info["cores"] == 4
-    assert info["threads"] == 8
-    assert info["memory_gb"] == 15.62
+
+
+def test_collect_hardware_prefers_nvidia(monkeypatch) -> None:
+    nvidia = [{"index": 0, "vendor": "NVIDIA", "name": "A", "memory_mb": 1}]
+    other = [{"index": None, "vendor": "OTHER", "name": "B", "memory_mb": None}]
+    monkeypatch.setattr(hi, "detect_nvidia_gpus", lambda: nvidia)
+    monkeypatch.setattr(hi, "detect_amd_gpus", lambda: [])
+    monkeypatch.setattr(hi, "detect_other_gpus", lambda: other)
+    monkeypatch.setattr(hi, "get_cpu_info", lambda: {"threads": 1})
+
+    assert hi.collect_hardware() == {"cpu": {"threads": 1}, "gpus": nvidia}
 
 
 def test_get_cpu_info_windows(monkeypatch) -> None:
     def fake_run(cmd: list[str]) -> str:  # type: ignore[override]
-        if cmd == ["wmic", "cpu", "get", "Name,NumberOfCores", "/format:csv"]:
-            return "Node,Name,NumberOfCores\nDESKTOP,WinCPU,6\n"
-        if cmd == [
-            "wmic",
-            "computersystem",
-            "get",
-            "totalphysicalmemory",
-            "/format:value",
-        ]:
-            return "TotalPhysicalMemory=17179869184\n"
+        if cmd == hi._CIM_CPU_CMD:
+            return (
+                '{"Name":"WinCPU","NumberOfCores":6,'
+                '"TotalPhysicalMemory":17179869184}\r\n'
+            )
         return ""
 
     monkeypatch.setattr(hi, "_run", fake_run)
     monkeypatch.setattr(hi.platform, "machine", lambda: "AMD64")
     monkeypatch.setattr(hi.platform, "system", lambda: "Windows")
     monkeypatch.setattr(hi.os, "cpu_count", lambda: 12)
+    monkeypatch.delattr(hi.os, "sched_getaffinity", raising=False)
 
     info = hi.get_cpu_info()
     assert info["name"] == "WinCPU"
     assert info["cores"] == 6
     assert info["threads"] == 12
     assert info["memory_gb"] == 16.0
+
+
+def test_get_cpu_info_windows_native_skips_wmi(monkeypatch) -> None:
+    def fail_run(cmd: list[str]) -> str:
+        raise AssertionError(f"unexpected subprocess: {cmd}")
+
+    monkeypatch.setattr(
+        hi,
+        "_windows_cpu_info",
+        lambda: {"name": "NativeCPU", "cores": 8, "memory_gb": 31.9},
+    )
+    monkeypatch.setattr(hi, "_run", fail_run)
+    monkeypatch.setattr(hi.platform, "system", lambda: "Windows")
+
+    info = hi.get_cpu_info()
+    assert info["name"] == "NativeCPU"
+    assert info["cores"] == 8
+    assert info["memory_gb"] == 31.9
+
+
+def test_cached_hardware_reuses_result_for_same_boot(monkeypatch, tmp_path) -> None:
+    calls = []
+    data = {"cpu": {}, "gpus": [{"index": 0, "vendor": "NVIDIA", "name": "A"}]}
+
+    def fake_collect():
+        calls.append(1)
+        return data
+
+    monkeypatch.setattr(hi, "_CACHE_PATH", tmp_path / "hw.json")
+    monkeypatch.setattr(hi, "_cache_key", lambda: ["host", "6.1", 100.0])
+    monkeypatch.setattr(hi, "collect_hardware", fake_collect)
+    assert hi.cached_hardware() == data
+    assert hi.cached_hardware() == data
+    assert len(calls) == 1
+
+    monkeypatch.setattr(hi, "_cache_key", lambda: ["host", "6.1", 200.0])
+    hi.cached_hardware()
+    assert len(calls) == 2
+
+
+def test_cached_hardware_does_not_store_empty_gpu_probe(monkeypatch, tmp_path) -> None:
+    calls = []
+
+    def fake_collect():
+        calls.append(1)
+        return {"cpu": {}, "gpus": []}
+
+    monkeypatch.setattr(hi, "_CACHE_PATH", tmp_path / "hw.json")
+    monkeypatch.setattr(hi, "_cache_key", lambda: ["host", "6.1", 100.0])
+    monkeypatch.setattr(hi, "collect_hardware", fake_collect)
+    hi.cached_hardware()
+    hi.cached_hardware()
+    assert len(calls) == 2
+    assert not (tmp_path / "hw.json").exists()
+
+
+@pytest.mark.skipif(os.name != "posix", reason="POSIX file modes")
+def test_cached_hardware_file_is_private(monkeypatch, tmp_path) -> None:
+    data = {"cpu": {}, "gpus": [{"index": 0, "vendor": "NVIDIA", "name": "A"}]}
+    path = tmp_path / "garvis" / "hw.json"
+    monkeypatch.setattr(hi, "_CACHE_PATH", path)
+    monkeypatch.setattr(hi, "_cache_key", lambda: ["host", "6.1", 100.0])
+    monkeypatch.setattr(hi, "collect_hardware", lambda: data)
+    hi.cached_hardware()
+    assert stat.S_IMODE(path.stat().st_mode) == 0o600
+    assert stat.S_IMODE(path.parent.stat().st_mode) == 0o700
+
+
+def test_cache_dir_is_per_user(monkeypatch, tmp_path) -> None:
+    monkeypatch.setattr(hi.platform, "system", lambda: "Linux")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    assert hi._cache_dir() == tmp_path / "garvis"
@@ -0,0 +1,61 @@
+"""
+HTTP contract of the router app, with upstream Ollama mocked out.
+"""
+
+import json
+
+import httpx
+from fastapi.testclient import TestClient
+
+
+def test_evaluate_returns_decision(router_module, monkeypatch):
+    gr = router_module
+    monkeypatch.setattr(gr, "HARDWARE", {"gpu0": {"vram_gb": 24, "est_tok_s": 40}})
+    monkeypatch.setattr(
+        gr,
+        "INVENTORY",
+        {"gar-chat": {"endpoint": "gpu0", "params": {"vram_req_gb": 8}}},
+    )
+    client = TestClient(gr.app)
+    resp = client.post("/evaluate", json={"prompt": "hi"})
+    assert resp.status_code == 200
+    assert resp.json()["evaluator"]["decision"] == {
+        "model": "gar-chat",
+        "endpoint": "gpu0",
+    }
+
+
+def test_generate_forwards_to_upstream(router_module, monkeypatch):
+    gr = router_module
+    monkeypatch.setattr(gr, "ENDPOINTS", {"gpu0": "http://upstream"})
+    monkeypatch.setattr(gr, "MODEL_MAP", {"gar-chat": "gpu0"})
+    monkeypatch.setattr(gr, "DEFAULT_MODELS", {})
+    monkeypatch.setattr(gr, "log_event", lambda ev: None)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.url.path == "/api/generate"
+        assert json.loads(request.content)["prompt"] == "hello"
+        return httpx.Response(200, json={"response": "hi"})
+
+    monkeypatch.setattr(
+        gr, "CLIENT", httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    client = TestClient(gr.app)
+    resp = client.post("/generate", json={"model": "gar-chat", "prompt": "hello"})
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["router"]["target"] == "gpu0"
+    assert data["upstream_response"] == {"response": "hi"}
+
+
+def test_unknown_path_lists_routes(router_module):
+    client = TestClient(router_module.app)
+    resp = client.post("/nope", json={})
+    assert resp.status_code == 404
+    assert "/route_and_generate" in resp.json()["error"]
+
+
+def test_upstream_client_pool_limits(router_module):
+    pool = router_module.CLIENT._transport._pool
+    assert pool._max_connections == 128
+    assert pool._max_keepalive_connections == 64
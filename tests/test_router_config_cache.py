@@ -0,0 +1,20 @@
+"""
+Config loading goes through a JSON sidecar that must follow YAML edits.
+"""
+
+import os
+
+from garvis_config import load_cfg
+
+
+def test_load_cfg_refreshes_sidecar(tmp_path):
+    cfg_path = tmp_path / "router.yaml"
+    cfg_path.write_text("router:\n  mode: heuristic\n", encoding="utf-8")
+
+    cfg = load_cfg(str(cfg_path))
+    assert cfg == {"router": {"mode": "heuristic"}}
+    assert os.path.exists(f"{cfg_path}.cache.json")
+    assert load_cfg(str(cfg_path)) == cfg
+
+    cfg_path.write_text("router:\n  mode: evaluator\n", encoding="utf-8")
+    assert load_cfg(str(cfg_path)) == {"router": {"mode": "evaluator"}}
@@ -25,3 +25,39 @@ def test_hint_model_normalization(router_module, monkeypatch):
 
     res = gr.evaluate_choice("", hint_model="GAR-ROUTER:latest")
     assert res["decision"]["endpoint"] == "gpu0"
+
+
+def test_decision_cache_follows_config_rebinding(router_module, monkeypatch):
+    gr = router_module
+    monkeypatch.setattr(gr, "ENDPOINTS", {"gpu0": "http://a", "gpu1": "http://b"})
+    monkeypatch.setattr(
+        gr, "HARDWARE", {"gpu0": {"vram_gb": 24}, "gpu1": {"vram_gb": 24}}
+    )
+    monkeypatch.setattr(gr, "POLICY", {"min_ctx_margin": 0.0})
+    monkeypatch.setattr(gr, "INVENTORY", {"a": {"endpoint": "gpu0", "params": {}}})
+    assert gr.evaluate_choice("hello")["decision"]["endpoint"] == "gpu0"
+
+    monkeypatch.setattr(gr, "INVENTORY", {"b": {"endpoint": "gpu1", "params": {}}})
+    assert gr.evaluate_choice("hello")["decision"]["endpoint"] == "gpu1"
+
+
+def test_hint_matches_inventory_key_with_latest_tag(router_module, monkeypatch):
+    gr = router_module
+    monkeypatch.setattr(gr, "ENDPOINTS", {"gpu0": "http://a", "gpu1": "http://b"})
+    monkeypatch.setattr(
+        gr,
+        "HARDWARE",
+        {"gpu0": {"vram_gb": 24, "est_tok_s": 10}, "gpu1": {"vram_gb": 24}},
+    )
+    monkeypatch.setattr(
+        gr,
+        "INVENTORY",
+        {
+            "fast:latest": {"endpoint": "gpu1", "params": {}},
+            "Slow:latest": {"endpoint": "gpu0", "params": {}},
+        },
+    )
+    monkeypatch.setattr(gr, "POLICY", {"min_ctx_margin": 0.0})
+
+    res = gr.evaluate_choice("hello", hint_model="slow")
+    assert res["decision"] == {"model": "Slow:latest", "endpoint": "gpu0"}
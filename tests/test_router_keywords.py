@@ -32,3 +32,21 @@ def test_decision_rules(
         endpoint = str(result)
 
     assert endpoint == expected_endpoint
+
+
+def test_pick_by_keywords_counts_distinct_hits(router_module, monkeypatch):
+    gr = router_module
+    monkeypatch.setattr(
+        gr,
+        "KEYWORD_INDEX",
+        gr._keyword_index(
+            {
+                "gpu0": ["python", "code"],
+                "gpu1": ["reason", "reasoning", "analysis"],
+            }
+        ),
+    )
+    # overlapping keywords all count: reason + reasoning + analysis = 3
+    assert gr.pick_by_keywords("Reasoning and analysis of python code") == "gpu1"
+    assert gr.pick_by_keywords("reasoning, reasoning, reasoning") == "gpu1"
+    assert gr.pick_by_keywords("nothing relevant") == "gpu0"